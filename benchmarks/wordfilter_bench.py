@@ -0,0 +1,343 @@
+"""Headless benchmarks for the WordFilter matchers.
+
+Generates synthetic filter lists and message corpora, then measures the
+per-message path of the original ``on_message`` loop against the current
+engines. Messages, members, roles and channels are plain stand-in
+objects, so neither Discord nor Red has to be installed or connected.
+
+Run from the repository root::
+
+    python benchmarks/wordfilter_bench.py
+    python benchmarks/wordfilter_bench.py --sizes 10,1000,20000,200000 --normalize
+
+Each row reports build time and memory for the filter list, latency
+percentiles in microseconds, throughput and the number of matched
+messages, which should agree between rows of the same list and corpus.
+The original loop never normalized, so with ``--normalize`` its hits
+differ by design.
+The original loop is slow on large lists, so each measurement stops after
+``--budget`` seconds and reports how many messages it managed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import random
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+import types
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Optional
+
+
+def load_wordfilter():
+    """Import the matcher modules without the cog, which needs Red."""
+    package = types.ModuleType("wordfilter")
+    package.__path__ = [str(Path(__file__).resolve().parent.parent / "wordfilter")]
+    sys.modules["wordfilter"] = package
+
+    from wordfilter import cache, matching, normalize, settings
+
+    return cache, matching, normalize, settings
+
+
+cache, matching, normalize, settings_module = load_wordfilter()
+
+
+# Filters and ordinary chat are built from disjoint syllables, so messages
+# only match where a filter was deliberately inserted.
+FILTER_SYLLABLES = [
+    "ka", "lo", "mi", "ne", "ru", "ta", "shi", "vo", "be", "dra",
+    "gon", "pel", "qua", "zi", "xo", "fen", "tur", "wil", "sa", "om",
+]
+CHAT_SYLLABLES = [
+    "the", "and", "you", "wha", "tis", "ing", "ple", "ost", "ere", "ay",
+    "ch", "ight", "ou", "ed", "ly", "str", "ck", "ph", "ew", "ah",
+]
+
+UNICODE_NOISE = [
+    "é", "ü", "ñ", "ß", "ø", "ｆｕｌｌ", "​", "­", "👀", "🔥",
+    "日本語", "привет", "ελληνικά", "ℌ𝔢𝔩𝔩𝔬", "Ⓒⓘⓡⓒⓛⓔ",
+]
+
+# Discord's character limit for Nitro subscribers.
+NITRO_LENGTH = 4000
+
+
+def pseudo_word(rng: random.Random, syllables: list[str], longest: int = 4) -> str:
+    return "".join(rng.choice(syllables) for _ in range(rng.randint(2, longest)))
+
+
+def make_filters(size: int, rng: random.Random, phrase_ratio: float = 0.2) -> list[str]:
+    """Return ``size`` distinct words and phrases."""
+    filters = set()
+    while len(filters) < size:
+        if rng.random() < phrase_ratio:
+            filters.add(
+                " ".join(
+                    pseudo_word(rng, FILTER_SYLLABLES) for _ in range(rng.randint(2, 3))
+                )
+            )
+        else:
+            filters.add(pseudo_word(rng, FILTER_SYLLABLES, longest=5))
+    return sorted(filters)
+
+
+def make_corpus(
+    kind: str,
+    count: int,
+    filters: list[str],
+    rng: random.Random,
+    hit_rate: float = 0.02,
+) -> list[str]:
+    """Return ``count`` messages of ``kind``, a few containing a filter."""
+    vocabulary = [pseudo_word(rng, CHAT_SYLLABLES) for _ in range(2000)]
+    messages = []
+    for _ in range(count):
+        if kind == "chat":
+            words = [rng.choice(vocabulary) for _ in range(rng.randint(3, 15))]
+        elif kind == "nitro":
+            words = []
+            length = 0
+            while length < NITRO_LENGTH - 20:
+                word = rng.choice(vocabulary)
+                if rng.random() < 0.05:
+                    word += "\n"
+                words.append(word)
+                length += len(word) + 1
+        elif kind == "unicode":
+            words = [
+                rng.choice(vocabulary) + rng.choice(UNICODE_NOISE)
+                if rng.random() < 0.5
+                else rng.choice(UNICODE_NOISE)
+                for _ in range(rng.randint(3, 30))
+            ]
+        else:
+            raise ValueError(f"Unknown corpus {kind!r}")
+        if filters and rng.random() < hit_rate:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(filters))
+        messages.append(" ".join(words)[:NITRO_LENGTH])
+    return messages
+
+
+def stub_message(content: str, rng: random.Random) -> SimpleNamespace:
+    """A stand-in for ``discord.Message`` with the attributes the cog reads."""
+    role_ids = rng.sample(range(1, 50), rng.randint(0, 5))
+    author = SimpleNamespace(
+        id=rng.randrange(1, 500),
+        bot=False,
+        roles=[SimpleNamespace(id=role_id) for role_id in role_ids],
+    )
+    channel = SimpleNamespace(id=rng.randrange(1000, 1010), category_id=900)
+    return SimpleNamespace(content=content, author=author, channel=channel)
+
+
+def legacy_on_message(filters: list[str], exempt_roles: list[int]):
+    """The per-message work of the original ``on_message`` listener."""
+
+    def handle(message) -> Optional[str]:
+        if any(role.id in exempt_roles for role in message.author.roles):
+            return None
+        content = message.content.lower()
+        for entry in filters:
+            entry = entry.lower()
+            if " " in entry:
+                if entry in content:
+                    return entry
+            elif re.search(rf"\b{re.escape(entry)}\b", content):
+                return entry
+        return None
+
+    return handle
+
+
+def current_on_message(guild_settings, scan_cache):
+    """The synchronous part of the current ``_scan`` path, minus Discord I/O."""
+
+    def handle(message) -> Optional[str]:
+        author = message.author
+        channel = message.channel
+        view = guild_settings.scope_view(channel.id, channel.category_id)
+        if view.exempt:
+            return None
+        if guild_settings.is_exempt(
+            author.id, view, lambda: [role.id for role in author.roles]
+        ):
+            return None
+        folded = guild_settings.fold(message.content)
+        plain = message.content.lower() if guild_settings.normalize else None
+        if plain is None or plain == folded:
+            plain = None
+            digest = cache.content_hash(folded)
+        else:
+            digest = cache.content_hash(f"{folded}\0{plain}")
+        version = guild_settings.version
+        matched = scan_cache.get(0, view.key, version, digest)
+        if matched is cache.MISSING:
+            matched = guild_settings.matcher.find(folded, plain=plain)
+            scan_cache.put(0, view.key, version, digest, matched)
+        return matched
+
+    return handle
+
+
+def measure_build(build: Callable[[], object]) -> tuple[object, float, int]:
+    """Return the built object, build seconds and bytes it allocated."""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    built = build()
+    elapsed = time.perf_counter() - started
+    current, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return built, elapsed, current
+
+
+def measure_scan(handle: Callable, messages: list, budget: float) -> dict:
+    """Run ``handle`` over ``messages`` until done or ``budget`` runs out."""
+    timings = []
+    hits = 0
+    deadline = time.perf_counter() + budget
+    for message in messages:
+        started = time.perf_counter_ns()
+        if handle(message):
+            hits += 1
+        timings.append(time.perf_counter_ns() - started)
+        if time.perf_counter() > deadline and len(timings) >= 5:
+            break
+    timings.sort()
+    total = sum(timings) / 1e9
+
+    def percentile(fraction: float) -> float:
+        return timings[min(len(timings) - 1, int(len(timings) * fraction))] / 1000
+
+    return {
+        "messages": len(timings),
+        "hits": hits,
+        "p50": percentile(0.50),
+        "p95": percentile(0.95),
+        "p99": percentile(0.99),
+        "mean": statistics.fmean(timings) / 1000,
+        "throughput": len(timings) / total if total else float("inf"),
+    }
+
+
+def format_row(columns: list[str], widths: list[int]) -> str:
+    return "  ".join(column.rjust(width) for column, width in zip(columns, widths))
+
+
+HEADER = [
+    "filters", "corpus", "engine", "build ms", "mem KiB", "msgs",
+    "p50 us", "p95 us", "p99 us", "msg/s", "hits",
+]
+WIDTHS = [8, 8, 10, 9, 9, 6, 10, 10, 10, 10, 5]
+
+
+def run(args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+
+    if args.normalize:
+        # The cog builds these tables at load time; keep them out of the
+        # first engine's build time.
+        normalize.strip_table()
+
+    print(format_row(HEADER, WIDTHS))
+
+    for size in args.sizes:
+        filters = make_filters(size, rng)
+        corpora = {
+            kind: [
+                stub_message(content, rng)
+                for content in make_corpus(kind, args.messages, filters, rng)
+            ]
+            for kind in args.corpora
+        }
+
+        candidates: list[tuple[str, Callable[[], Callable]]] = []
+        if not args.skip_legacy:
+            candidates.append(
+                ("legacy", lambda: legacy_on_message(list(filters), [9999]))
+            )
+        for engine in args.engines:
+
+            def build(engine: str = engine) -> Callable:
+                guild_settings = settings_module.GuildSettings(
+                    word_count=len(filters),
+                    exempt_roles=frozenset({9999}),
+                    engine=engine,
+                    normalize=args.normalize,
+                )
+                guild_settings.replace_base(guild_settings.compile_base(filters, ()))
+                # A fresh cache per engine, sized like the cog's, so repeated
+                # content is served from it exactly as in production.
+                return current_on_message(guild_settings, cache.ScanCache())
+
+            candidates.append((engine, build))
+
+        for name, build in candidates:
+            handle, build_seconds, memory = measure_build(build)
+            for kind, messages in corpora.items():
+                result = measure_scan(handle, messages, args.budget)
+                print(
+                    format_row(
+                        [
+                            str(size),
+                            kind,
+                            name,
+                            f"{build_seconds * 1000:.1f}",
+                            f"{memory / 1024:.0f}",
+                            str(result["messages"]),
+                            f"{result['p50']:.1f}",
+                            f"{result['p95']:.1f}",
+                            f"{result['p99']:.1f}",
+                            f"{result['throughput']:.0f}",
+                            str(result["hits"]),
+                        ],
+                        WIDTHS,
+                    ),
+                    flush=True,
+                )
+            del handle
+            gc.collect()
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        default="10,1000,20000",
+        type=lambda value: [int(size) for size in value.split(",")],
+        help="comma-separated filter list sizes (default: 10,1000,20000)",
+    )
+    parser.add_argument(
+        "--corpora",
+        default="chat,nitro,unicode",
+        type=lambda value: value.split(","),
+        help="comma-separated corpora: chat, nitro, unicode",
+    )
+    parser.add_argument(
+        "--engines",
+        default=",".join(sorted(matching.ENGINES)),
+        type=lambda value: value.split(","),
+        help="comma-separated engines to compare with the original loop",
+    )
+    parser.add_argument("--messages", type=int, default=500, help="messages per corpus")
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=5.0,
+        help="seconds allowed per measurement before it is cut short",
+    )
+    parser.add_argument("--normalize", action="store_true", help="enable normalization")
+    parser.add_argument("--skip-legacy", action="store_true", help="skip the original loop")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    run(parse_args())
@@ -0,0 +1,9 @@
+import sys
+import types
+from pathlib import Path
+
+# The cog itself needs Red; the matcher modules do not. Register the
+# package without running its ``__init__`` so they import on their own.
+package = types.ModuleType("wordfilter")
+package.__path__ = [str(Path(__file__).resolve().parent.parent / "wordfilter")]
+sys.modules["wordfilter"] = package
@@ -0,0 +1,50 @@
+import time
+
+import pytest
+
+from wordfilter.patterns import UnsafePatternError, validate_pattern
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        r"\w+\s+\w+",
+        r"x+y+x+",
+        r"\d{3}-\d{4}",
+        r"\w{3}\w+",
+        r"colou?r",
+        r"free\s*nitro",
+        r"discord\.gg/\w+",
+        r"[a-z]+\d+",
+    ],
+)
+def test_accepts_safe_patterns(source):
+    assert validate_pattern(source).pattern == source
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        r"\w{1,100}\w{1,100}\w{1,100}!",
+        r"\w{1,9}\w{1,9}",
+        r"\w*\w*\w*\w*\w*!",
+        r".*a.*",
+        r"\w+\d{2,50}",
+        r"(a+)+",
+        r"(a|aa)+",
+        r"(a)\1",
+        r"a{101}",
+        r"(",
+        "a" * 201,
+    ],
+)
+def test_rejects_unsafe_patterns(source):
+    with pytest.raises(UnsafePatternError):
+        validate_pattern(source)
+
+
+def test_accepted_counted_repeats_stay_fast():
+    pattern = validate_pattern(r"\d{1,20}-\w{1,20}!")
+    started = time.perf_counter()
+    assert pattern.search("1-" + "a" * 4000) is None
+    assert time.perf_counter() - started < 0.5
@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+
+log = logging.getLogger("red.xalvas.wordfilter")
+
+# Hits older than this are purged when the store is opened, and again
+# every ``PURGE_INTERVAL`` while it stays open.
+RETENTION = timedelta(days=90)
+PURGE_INTERVAL = timedelta(days=1)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hits (
+    id INTEGER PRIMARY KEY,
+    guild_id INTEGER NOT NULL,
+    channel_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    matched_filter TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS hits_by_time ON hits (guild_id, created_at);
+CREATE INDEX IF NOT EXISTS hits_by_user ON hits (guild_id, user_id, created_at);
+CREATE INDEX IF NOT EXISTS hits_by_filter ON hits (guild_id, matched_filter, created_at);
+"""
+
+
+@dataclass(frozen=True)
+class AuditRecord:
+    """One stored filter hit."""
+
+    guild_id: int
+    channel_id: int
+    user_id: int
+    matched_filter: str
+    created_at: datetime
+    content: str
+
+
+class HitStore:
+    """An append-only SQLite log of filter hits with indexed search.
+
+    Hits are buffered in memory and written in one transaction per flush
+    window. Every database call runs on a single dedicated thread, which
+    owns the connection, so the event loop never waits on disk I/O.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        flush_interval: float = 2.0,
+        max_pending: int = 10000,
+    ) -> None:
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pool = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="wordfilter-audit"
+        )
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pending: list[tuple[Any, ...]] = []
+        self._task: Optional[asyncio.Task[None]] = None
+        self._purge_task: Optional[asyncio.Task[None]] = None
+        self.dropped = 0
+
+    async def _run(self, function: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, function, *args)
+
+    async def open(self) -> None:
+        await self._run(self._open)
+        self._purge_task = asyncio.create_task(self._purge_loop())
+
+    def _open(self) -> None:
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(SCHEMA)
+        self._connection = connection
+        self._purge()
+
+    async def _purge_loop(self) -> None:
+        while True:
+            await asyncio.sleep(PURGE_INTERVAL.total_seconds())
+            try:
+                await self._run(self._purge)
+            except sqlite3.Error:
+                log.exception("Failed to purge expired audit log entries")
+
+    def _purge(self) -> None:
+        if self._connection is None:
+            return
+        cutoff = (datetime.now(timezone.utc) - RETENTION).timestamp()
+        with self._connection:
+            self._connection.execute(
+                "DELETE FROM hits WHERE created_at < ?", (cutoff,)
+            )
+
+    def record(
+        self,
+        guild_id: int,
+        channel_id: int,
+        user_id: int,
+        matched_filter: str,
+        content: str,
+        created_at: datetime,
+    ) -> None:
+        """Queue a hit for the next batched write."""
+        if self._connection is None:
+            return
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self._pending.append(
+            (
+                guild_id,
+                channel_id,
+                user_id,
+                matched_filter,
+                created_at.timestamp(),
+                content,
+            )
+        )
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        while self._pending:
+            await asyncio.sleep(self.flush_interval)
+            await self._flush()
+
+    async def _flush(self) -> None:
+        rows = self._pending
+        self._pending = []
+        if self.dropped:
+            log.warning(
+                "Dropped %s audit log entries; the write queue was full",
+                self.dropped,
+            )
+            self.dropped = 0
+        if not rows:
+            return
+        try:
+            await self._run(self._insert, rows)
+        except sqlite3.Error:
+            log.exception("Failed to write %s audit log entries", len(rows))
+
+    def _insert(self, rows: list[tuple[Any, ...]]) -> None:
+        with self._connection:
+            self._connection.executemany(
+                "INSERT INTO hits (guild_id, channel_id, user_id, matched_filter,"
+                " created_at, content) VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    async def search(
+        self,
+        guild_id: int,
+        *,
+        user_id: Optional[int] = None,
+        matched_filter: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: int = 250,
+    ) -> list[AuditRecord]:
+        """Return up to ``limit`` matching hits, newest first.
+
+        Hits still waiting for their batched write are included.
+        """
+        await self._flush()
+        clauses = ["guild_id = ?"]
+        parameters: list[Any] = [guild_id]
+        if user_id is not None:
+            clauses.append("user_id = ?")
+            parameters.append(user_id)
+        if matched_filter is not None:
+            clauses.append("matched_filter = ?")
+            parameters.append(matched_filter)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            parameters.append(since.timestamp())
+        if until is not None:
+            clauses.append("created_at < ?")
+            parameters.append(until.timestamp())
+        query = (
+            "SELECT guild_id, channel_id, user_id, matched_filter, created_at,"
+            f" content FROM hits WHERE {' AND '.join(clauses)}"
+            " ORDER BY created_at DESC LIMIT ?"
+        )
+        parameters.append(limit)
+        rows = await self._run(self._fetch, query, parameters)
+        return [
+            AuditRecord(
+                guild_id=row[0],
+                channel_id=row[1],
+                user_id=row[2],
+                matched_filter=row[3],
+                created_at=datetime.fromtimestamp(row[4], timezone.utc),
+                content=row[5],
+            )
+            for row in rows
+        ]
+
+    def _fetch(self, query: str, parameters: list[Any]) -> list[tuple[Any, ...]]:
+        if self._connection is None:
+            return []
+        return self._connection.execute(query, parameters).fetchall()
+
+    async def delete_user(self, user_id: int) -> None:
+        """Remove every stored hit for ``user_id``."""
+        self._pending = [row for row in self._pending if row[2] != user_id]
+        await self._run(self._delete_user, user_id)
+
+    def _delete_user(self, user_id: int) -> None:
+        if self._connection is None:
+            return
+        with self._connection:
+            self._connection.execute("DELETE FROM hits WHERE user_id = ?", (user_id,))
+
+    async def close(self) -> None:
+        """Write anything still queued and close the database."""
+        tasks = [task for task in (self._task, self._purge_task) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._connection is not None:
+            await self._flush()
+            await self._run(self._close)
+        self._pool.shutdown(wait=True)
+
+    def _close(self) -> None:
+        self._connection.close()
+        self._connection = None
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import math
+import re
+from collections.abc import Iterable
+
+
+NON_WORD = re.compile(r"\W")
+
+# Characters kept on each side of the anchor when building a key.
+ANCHOR_CONTEXT = 3
+
+
+class BloomFilter:
+    """A fixed-size Bloom filter over strings, backed by a ``bytearray``.
+
+    Bit positions come from double hashing of the built-in string hash,
+    which is salted per process. That is fine because the filter is rebuilt
+    in memory and never persisted.
+    """
+
+    __slots__ = ("_bits", "_size", "_hashes")
+
+    def __init__(self, capacity: int, error_rate: float = 0.001) -> None:
+        capacity = max(capacity, 1)
+        size = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        self._size = max(size, 8)
+        self._hashes = max(1, round(self._size / capacity * math.log(2)))
+        self._bits = bytearray((self._size + 7) // 8)
+
+    def add(self, item: str) -> None:
+        value = hash(item) & 0xFFFFFFFFFFFFFFFF
+        first = value & 0xFFFFFFFF
+        second = (value >> 32) | 1
+        bits = self._bits
+        size = self._size
+        for index in range(self._hashes):
+            position = (first + index * second) % size
+            bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        value = hash(item) & 0xFFFFFFFFFFFFFFFF
+        first = value & 0xFFFFFFFF
+        second = (value >> 32) | 1
+        bits = self._bits
+        size = self._size
+        for index in range(self._hashes):
+            position = (first + index * second) % size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._bits)
+
+
+class AnchorPrefilter:
+    """Prove content clean with a few Bloom probes per non-word character.
+
+    Entries that reach the phrase engine always contain a non-word
+    character, such as the space in a phrase. Each entry contributes the
+    text around its first such character, and content can only match the
+    entry if that same window occurs around one of the content's own
+    non-word characters. Probes therefore scale with the number of spaces
+    and punctuation marks in a message rather than with the list size.
+    False positives only cost the exact scan that would have run anyway.
+    """
+
+    __slots__ = ("_bloom", "_shapes")
+
+    def __init__(self, entries: Iterable[str], context: int = ANCHOR_CONTEXT) -> None:
+        keys = set()
+        shapes = set()
+        for entry in entries:
+            anchor = NON_WORD.search(entry)
+            if anchor is None:
+                # Only word-token entries lack an anchor, and those never
+                # reach the phrase engine; refuse to guess rather than
+                # risk a false negative.
+                raise ValueError(f"Entry {entry!r} has no non-word character")
+            position = anchor.start()
+            before = min(context, position)
+            after = min(context, len(entry) - position - 1)
+            keys.add(entry[position - before : position + 1 + after])
+            shapes.add((before, after))
+
+        # Widest windows first; they are the most selective.
+        self._shapes = tuple(sorted(shapes, reverse=True))
+        self._bloom = BloomFilter(len(keys))
+        for key in keys:
+            self._bloom.add(key)
+
+    @property
+    def nbytes(self) -> int:
+        return self._bloom.nbytes
+
+    def might_match(self, content: str) -> bool:
+        """Return ``False`` only when no entry can occur in ``content``."""
+        bloom = self._bloom
+        shapes = self._shapes
+        length = len(content)
+        for anchor in NON_WORD.finditer(content):
+            position = anchor.start()
+            for before, after in shapes:
+                end = position + 1 + after
+                if (
+                    position >= before
+                    and end <= length
+                    and content[position - before : end] in bloom
+                ):
+                    return True
+        return False
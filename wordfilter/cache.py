@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+
+MISSING = object()
+
+# Keys are fixed-size digests plus a scope shared with the guild's
+# settings, and cached values reference filter strings owned by the
+# matcher, so every entry costs roughly the same: two small tuples, an
+# int, a float and the digest itself.
+ENTRY_BYTES = 320
+
+
+def content_hash(content: str) -> bytes:
+    """Return a compact digest identifying ``content``."""
+    return hashlib.blake2b(
+        content.encode("utf-8", "surrogatepass"), digest_size=16
+    ).digest()
+
+
+class ScanCache:
+    """A bounded, expiring LRU of scan results for identical content.
+
+    Entries are keyed on the guild, the scope the content was scanned
+    under and a digest of the folded content, and remember the filter-list
+    version they were computed against, so a result is only served while
+    the guild's filters are unchanged. The same content posted in channels
+    with different scoped rules gets one entry per scope. Values
+    are the matched filter, or ``None`` for clean content, and a lookup
+    returns ``MISSING`` when nothing usable is cached.
+    """
+
+    __slots__ = ("maxsize", "ttl", "_entries", "hits", "misses")
+
+    def __init__(self, max_bytes: int = 4 * 1024 * 1024, ttl: float = 300.0) -> None:
+        self.maxsize = max(1, max_bytes // ENTRY_BYTES)
+        self.ttl = ttl
+        self._entries: OrderedDict[
+            tuple[int, Hashable, bytes], tuple[Hashable, float, Optional[str]]
+        ] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, guild_id: int, scope: Hashable, version: Hashable, digest: bytes):
+        """Return the cached result or ``MISSING``."""
+        key = (guild_id, scope, digest)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return MISSING
+        entry_version, expires, value = entry
+        if entry_version != version or expires < time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return MISSING
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(
+        self,
+        guild_id: int,
+        scope: Hashable,
+        version: Hashable,
+        digest: bytes,
+        value: Optional[str],
+    ) -> None:
+        """Remember ``value``, evicting expired and least recent entries."""
+        now = time.monotonic()
+        key = (guild_id, scope, digest)
+        entries = self._entries
+        entries[key] = (version, now + self.ttl, value)
+        entries.move_to_end(key)
+        while len(entries) > self.maxsize:
+            entries.popitem(last=False)
+        # Opportunistically drop expired entries from the cold end.
+        while entries:
+            oldest_key, (_version, expires, _value) = next(iter(entries.items()))
+            if expires >= now:
+                break
+            del entries[oldest_key]
+
+    def discard_guild(self, guild_id: int) -> None:
+        """Forget every result cached for ``guild_id``."""
+        for key in [key for key in self._entries if key[0] == guild_id]:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Optional
+
+import discord
+
+from .metrics import FilterMetrics
+
+
+log = logging.getLogger("red.xalvas.wordfilter")
+
+# Discord refuses bulk deletes of more than 100 messages or of messages
+# older than 14 days. Keep a margin so a request never races the cut-off.
+MAX_BULK_DELETE = 100
+MAX_BULK_DELETE_AGE = timedelta(days=14) - timedelta(minutes=5)
+
+
+@dataclass
+class ChannelBatch:
+    """Matched messages awaiting deletion in one channel."""
+
+    channel: discord.abc.Messageable
+    guild_id: int
+    messages: list[discord.abc.Snowflake] = field(default_factory=list)
+    task: Optional[asyncio.Task[None]] = None
+
+
+class DeletionExecutor:
+    """Delete matched messages, switching to bulk deletes during floods.
+
+    The first match in a quiet channel is deleted immediately and opens a
+    short window. Matches arriving while the window is open are collected
+    and removed with ``delete_messages`` when it closes, and the window
+    stays open for as long as each flush still had work to do.
+    """
+
+    def __init__(
+        self, *, window: float = 1.0, metrics: Optional[FilterMetrics] = None
+    ) -> None:
+        self.window = window
+        self.metrics = metrics
+        self._batches: dict[int, ChannelBatch] = {}
+
+    async def delete(self, message: discord.abc.Snowflake) -> None:
+        """Delete ``message`` now, or queue it if its channel is flooding."""
+        channel = message.channel
+        batch = self._batches.get(channel.id)
+        if batch is not None:
+            batch.messages.append(message)
+            return
+
+        batch = ChannelBatch(channel=channel, guild_id=message.guild.id)
+        self._batches[channel.id] = batch
+        batch.task = asyncio.create_task(self._flush_loop(channel.id))
+        await self._delete_one(batch.guild_id, message)
+
+    async def close(self) -> None:
+        """Stop every window and delete whatever is still queued."""
+        batches = list(self._batches.values())
+        self._batches.clear()
+        tasks = [
+            batch.task
+            for batch in batches
+            if batch.task is not None and not batch.task.done()
+        ]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for batch in batches:
+            if batch.messages:
+                await self._flush(batch, batch.messages)
+
+    async def _flush_loop(self, channel_id: int) -> None:
+        while True:
+            await asyncio.sleep(self.window)
+            batch = self._batches.get(channel_id)
+            if batch is None:
+                return
+            if not batch.messages:
+                self._batches.pop(channel_id, None)
+                return
+            messages = batch.messages
+            batch.messages = []
+            try:
+                await self._flush(batch, messages)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception(
+                    "Failed to delete %s filtered messages in channel %s",
+                    len(messages),
+                    channel_id,
+                )
+
+    def _record(self, guild_id: int, started: float, failed: bool) -> None:
+        if self.metrics is not None:
+            self.metrics.guild(guild_id).deletes.record(
+                time.perf_counter() - started, failed
+            )
+
+    async def _flush(
+        self,
+        batch: ChannelBatch,
+        messages: list[discord.abc.Snowflake],
+    ) -> None:
+        channel = batch.channel
+        cutoff = discord.utils.utcnow() - MAX_BULK_DELETE_AGE
+        recent = [message for message in messages if message.created_at > cutoff]
+        old = [message for message in messages if message.created_at <= cutoff]
+
+        bulk_delete = getattr(channel, "delete_messages", None)
+        if bulk_delete is None:
+            old.extend(recent)
+            recent = []
+
+        for start in range(0, len(recent), MAX_BULK_DELETE):
+            chunk = recent[start : start + MAX_BULK_DELETE]
+            if len(chunk) == 1:
+                old.extend(chunk)
+                continue
+            started = time.perf_counter()
+            try:
+                await bulk_delete(chunk)
+            except discord.Forbidden:
+                self._record(batch.guild_id, started, True)
+                return
+            except discord.HTTPException:
+                # A single stale ID fails the whole request; retry one by one.
+                self._record(batch.guild_id, started, True)
+                old.extend(chunk)
+            else:
+                self._record(batch.guild_id, started, False)
+
+        for message in old:
+            await self._delete_one(batch.guild_id, message)
+
+    async def _delete_one(
+        self, guild_id: int, message: discord.abc.Snowflake
+    ) -> None:
+        started = time.perf_counter()
+        try:
+            await message.delete()
+        except discord.NotFound:
+            # Already gone, which is what we wanted.
+            self._record(guild_id, started, False)
+        except discord.Forbidden:
+            self._record(guild_id, started, True)
+        except discord.HTTPException:
+            # A 5xx or an exhausted rate limit fails this message only; the
+            # rest of the batch, or the unload, must still go ahead.
+            self._record(guild_id, started, True)
+            log.warning(
+                "Failed to delete filtered message %s in guild %s",
+                message.id,
+                guild_id,
+                exc_info=True,
+            )
+        else:
+            self._record(guild_id, started, False)
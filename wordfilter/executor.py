@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+
+# Scans below both thresholds are cheaper inline than a thread hand-off.
+OFFLOAD_MIN_LENGTH = 1000
+OFFLOAD_MIN_FILTERS = 20000
+
+
+class ScanExecutor:
+    """Run expensive scans on a small thread pool with bounded backlog.
+
+    Long messages and very large matchers are scanned on worker threads.
+    This only helps pure-Python scans: the interpreter hands the GIL back
+    every few milliseconds, so the event loop keeps servicing heartbeats
+    in between. A search inside ``re`` holds the GIL until it returns, so
+    callers pass ``offload=False`` for regex-bound scans, which then run
+    inline rather than pay for a hand-off that frees nothing. When
+    ``max_pending`` scans are already queued, new scans run inline instead
+    of growing the backlog without limit.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_workers: int = 2,
+        max_pending: int = 16,
+        min_length: int = OFFLOAD_MIN_LENGTH,
+        min_filters: int = OFFLOAD_MIN_FILTERS,
+    ) -> None:
+        self.max_pending = max_pending
+        self.min_length = min_length
+        self.min_filters = min_filters
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="wordfilter-scan"
+        )
+        self._pending = 0
+        self.offloaded = 0
+        self.saturated = 0
+
+    def should_offload(self, content: str, filters: int) -> bool:
+        """Return whether scanning ``content`` is heavy enough to offload."""
+        return len(content) >= self.min_length or filters >= self.min_filters
+
+    async def run(
+        self,
+        scan: Callable[[str], Optional[str]],
+        content: str,
+        filters: int,
+        *,
+        offload: bool = True,
+    ) -> Optional[str]:
+        """Return ``scan(content)`` against ``filters`` entries.
+
+        The scan is offloaded when ``offload`` allows it, it is heavy
+        enough and the pool has room.
+        """
+        if not offload or not self.should_offload(content, filters):
+            return scan(content)
+        if self._pending >= self.max_pending:
+            self.saturated += 1
+            return scan(content)
+
+        self._pending += 1
+        self.offloaded += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, scan, content)
+        finally:
+            self._pending -= 1
+
+    def shutdown(self) -> None:
+        """Stop the pool without waiting for scans already running."""
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import re
+import threading
+from collections.abc import Iterable, Mapping
+from typing import Optional
+
+from .matching import FilterMatcher, build_matcher
+from .normalize import normalize_text
+
+
+# Shared sets are typically large imported lists, so they always use the
+# memory-compact engine.
+FILTER_SET_ENGINE = "compact"
+
+VALID_SET_NAME = re.compile(r"[a-z0-9][a-z0-9_-]{0,31}")
+
+
+class FilterSetRegistry:
+    """Owner-defined filter sets compiled once per process.
+
+    Guilds subscribe to sets by name and scan them next to their own
+    matcher, so an entry list used by many guilds is stored and compiled
+    a single time. ``version`` changes whenever any set changes, which
+    lets callers invalidate results that depended on the old contents.
+
+    Matchers may be compiled on worker threads. A matcher is only cached
+    while the entries it was compiled from are still current, so a
+    compile that loses a race with an edit is discarded.
+    """
+
+    def __init__(self) -> None:
+        self._entries: dict[str, frozenset[str]] = {}
+        self._compiled: dict[tuple[str, bool], FilterMatcher] = {}
+        self._lock = threading.Lock()
+        self.version = 0
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._entries
+
+    def names(self) -> list[str]:
+        return sorted(self._entries)
+
+    def entries(self, name: str) -> frozenset[str]:
+        return self._entries.get(name, frozenset())
+
+    def load(self, data: dict[str, list[str]]) -> None:
+        """Replace every set with the stored ``data``."""
+        with self._lock:
+            self._entries = {name: frozenset(words) for name, words in data.items()}
+            self._compiled.clear()
+        self.version += 1
+
+    def set(
+        self,
+        name: str,
+        words: frozenset[str],
+        compiled: Optional[Mapping[bool, Optional[FilterMatcher]]] = None,
+    ) -> None:
+        """Create or replace the set ``name``.
+
+        ``compiled`` maps normalization flags to matchers built from
+        ``words`` with :meth:`build`, which are swapped in together with
+        the entries. Other variants compile on first use.
+        """
+        with self._lock:
+            self._entries[name] = words
+            self._drop_compiled(name)
+            for normalize, matcher in (compiled or {}).items():
+                if matcher is not None:
+                    self._compiled[(name, normalize)] = matcher
+
+    def delete(self, name: str) -> None:
+        with self._lock:
+            self._entries.pop(name, None)
+            self._drop_compiled(name)
+
+    def compiled_variants(self, name: str) -> set[bool]:
+        """Return the normalization flags ``name`` is currently compiled for."""
+        return {normalize for set_name, normalize in self._compiled if set_name == name}
+
+    @staticmethod
+    def build(words: Iterable[str], normalize: bool) -> Optional[FilterMatcher]:
+        """Compile ``words`` like a set's matcher. Safe to run on a worker thread."""
+        words = frozenset(words)
+        if not words:
+            return None
+        return build_matcher(
+            words,
+            FILTER_SET_ENGINE,
+            normalize_text if normalize else None,
+        )
+
+    def _drop_compiled(self, name: str) -> None:
+        # Called with the lock held.
+        for key in [key for key in self._compiled if key[0] == name]:
+            del self._compiled[key]
+        self.version += 1
+
+    def matcher(self, name: str, normalize: bool) -> Optional[FilterMatcher]:
+        """Return the compiled matcher for ``name``, building it on first use.
+
+        Sets are compiled separately for guilds with and without
+        normalization, because entries must be folded like the messages.
+        """
+        key = (name, normalize)
+        matcher = self._compiled.get(key)
+        if matcher is None:
+            words = self._entries.get(name)
+            if not words:
+                return None
+            matcher = self.build(words, normalize)
+            with self._lock:
+                if self._entries.get(name) is words:
+                    self._compiled[key] = matcher
+        return matcher
+
+    def matchers(
+        self, names: Iterable[str], normalize: bool
+    ) -> list[FilterMatcher]:
+        """Return compiled matchers for every existing set in ``names``."""
+        matchers = []
+        for name in names:
+            matcher = self.matcher(name, normalize)
+            if matcher is not None:
+                matchers.append(matcher)
+        return matchers
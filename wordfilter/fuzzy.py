@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+from collections.abc import Mapping
+from typing import Callable, Optional
+
+from .matching import WORD_TOKEN
+
+
+MAX_DISTANCE = 2
+
+# Shortest entry allowed at each distance. Shorter words are within one or
+# two edits of far too many ordinary words to be filtered fuzzily.
+MIN_LENGTH = {1: 4, 2: 7}
+
+
+def deletions(word: str, distance: int) -> set[str]:
+    """Return ``word`` and every string reachable by up to ``distance`` deletes."""
+    variants = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {
+            variant[:index] + variant[index + 1 :]
+            for variant in frontier
+            for index in range(len(variant))
+        }
+        variants |= frontier
+    return variants
+
+
+def edit_distance(first: str, second: str, limit: int) -> int:
+    """Return the edit distance between two strings, capped at ``limit + 1``.
+
+    Insertions, deletions, substitutions and swaps of adjacent characters
+    each count as one edit (optimal string alignment distance).
+    """
+    if abs(len(first) - len(second)) > limit:
+        return limit + 1
+    previous_row = None
+    row = list(range(len(second) + 1))
+    for i in range(1, len(first) + 1):
+        before, previous_row = previous_row, row
+        row = [i] + [0] * len(second)
+        for j in range(1, len(second) + 1):
+            cost = first[i - 1] != second[j - 1]
+            value = min(
+                previous_row[j] + 1,
+                row[j - 1] + 1,
+                previous_row[j - 1] + cost,
+            )
+            if (
+                before is not None
+                and j > 1
+                and first[i - 1] == second[j - 2]
+                and first[i - 2] == second[j - 1]
+            ):
+                value = min(value, before[j - 2] + 1)
+            row[j] = value
+        if min(row) > limit:
+            return limit + 1
+    return min(row[-1], limit + 1)
+
+
+class FuzzyIndex:
+    """A symmetric-deletion index of word filters with per-entry distances.
+
+    Every entry is stored under each string reachable from it by up to its
+    own distance in deletions. Two words within distance ``d`` always share
+    such a variant, so looking up the deletions of a message token finds
+    every candidate without comparing it against the whole list. Only the
+    few candidates found are checked with an exact edit distance.
+    """
+
+    __slots__ = ("_deletes", "_distances", "_max_distance", "_shortest", "_longest")
+
+    def __init__(
+        self,
+        entries: Mapping[str, int],
+        normalizer: Optional[Callable[[str], str]] = None,
+    ) -> None:
+        distances: dict[str, tuple[str, int]] = {}
+        for entry, distance in entries.items():
+            folded = normalizer(entry) if normalizer is not None else entry
+            if distance <= 0 or not WORD_TOKEN.fullmatch(folded):
+                continue
+            current = distances.get(folded)
+            if current is None or distance > current[1]:
+                distances[folded] = (entry, distance)
+
+        deletes: dict[str, list[str]] = {}
+        for folded, (_entry, distance) in distances.items():
+            for variant in deletions(folded, distance):
+                deletes.setdefault(variant, []).append(folded)
+
+        self._deletes = deletes
+        self._distances = distances
+        self._max_distance = max(
+            (distance for _entry, distance in distances.values()), default=0
+        )
+        self._shortest = min(map(len, distances), default=0)
+        self._longest = max(map(len, distances), default=0)
+
+    def __len__(self) -> int:
+        return len(self._distances)
+
+    @property
+    def regex_bound(self) -> bool:
+        return False
+
+    def find(self, content: str, *, plain: Optional[str] = None) -> Optional[str]:
+        """Return the first entry within its distance of a token in ``content``.
+
+        Tokens of ``plain``, the merely lowercased message, are checked too.
+        """
+        if not self._distances:
+            return None
+        deletes = self._deletes
+        distances = self._distances
+        max_distance = self._max_distance
+        shortest = self._shortest - max_distance
+        longest = self._longest + max_distance
+        tokens = set(WORD_TOKEN.findall(content))
+        if plain is not None:
+            tokens.update(WORD_TOKEN.findall(plain))
+        for token in tokens:
+            if not shortest <= len(token) <= longest:
+                continue
+            checked = set()
+            for variant in deletions(token, max_distance):
+                for candidate in deletes.get(variant, ()):
+                    if candidate in checked:
+                        continue
+                    checked.add(candidate)
+                    entry, distance = distances[candidate]
+                    if edit_distance(token, candidate, distance) <= distance:
+                        return entry
+        return None
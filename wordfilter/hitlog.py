@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+
+import discord
+
+from .metrics import FilterMetrics
+
+
+log = logging.getLogger("red.xalvas.wordfilter")
+
+# Discord accepts at most ten embeds per message.
+MAX_EMBEDS_PER_MESSAGE = 10
+
+
+@dataclass
+class FilterHit:
+    """Everything needed to describe one deleted message in the log."""
+
+    member_mention: str
+    member_id: int
+    channel_mention: str
+    matched_filter: str
+    content: str
+    created_at: datetime = field(default_factory=discord.utils.utcnow)
+
+
+@dataclass
+class GuildHitQueue:
+    """Pending hits for one guild and the channel they will be sent to."""
+
+    channel: discord.abc.Messageable
+    guild_name: str
+    hits: deque[FilterHit] = field(default_factory=deque)
+    dropped: int = 0
+    task: Optional[asyncio.Task[None]] = None
+
+
+def hit_embed(hit: FilterHit, guild_name: str) -> discord.Embed:
+    """Render a single filter hit as a log embed."""
+    embed = discord.Embed(
+        title="🚨 Filter Triggered",
+        colour=discord.Colour.red(),
+        timestamp=hit.created_at,
+    )
+    embed.add_field(
+        name="Member",
+        value=f"{hit.member_mention}\n`{hit.member_id}`",
+        inline=False,
+    )
+    embed.add_field(name="Channel", value=hit.channel_mention, inline=False)
+    embed.add_field(
+        name="Matched Filter", value=f"`{hit.matched_filter}`", inline=False
+    )
+    embed.add_field(
+        name="Message Content",
+        value=hit.content[:1024] or "*No content*",
+        inline=False,
+    )
+    embed.set_footer(text=guild_name)
+    return embed
+
+
+def digest_embed(
+    hits: list[FilterHit], dropped: int, guild_name: str
+) -> discord.Embed:
+    """Summarise a burst of hits in one embed."""
+    embed = discord.Embed(
+        title=f"🚨 Filter Triggered {len(hits)} Times",
+        colour=discord.Colour.red(),
+        timestamp=hits[-1].created_at,
+    )
+    top_members = Counter(
+        (hit.member_mention, hit.member_id) for hit in hits
+    ).most_common(10)
+    embed.add_field(
+        name="Members",
+        value="\n".join(
+            f"{mention} `{member_id}` × {count}"
+            for (mention, member_id), count in top_members
+        ),
+        inline=False,
+    )
+    top_channels = Counter(hit.channel_mention for hit in hits).most_common(10)
+    embed.add_field(
+        name="Channels",
+        value="\n".join(f"{mention} × {count}" for mention, count in top_channels),
+        inline=False,
+    )
+    top_filters = Counter(hit.matched_filter for hit in hits).most_common(10)
+    embed.add_field(
+        name="Matched Filters",
+        value="\n".join(f"`{entry}` × {count}" for entry, count in top_filters)[
+            :1024
+        ],
+        inline=False,
+    )
+    if dropped:
+        embed.add_field(
+            name="Dropped",
+            value=f"{dropped} hit(s) were not logged because the queue was full.",
+            inline=False,
+        )
+    embed.set_footer(text=guild_name)
+    return embed
+
+
+class HitLogQueue:
+    """Batch filter hits per guild and send them on a short flush window.
+
+    Each guild has a bounded queue drained by a single background flusher.
+    Quiet periods produce messages of up to ten embeds, and bursts larger
+    than ``digest_threshold`` are collapsed into one digest embed.
+    """
+
+    def __init__(
+        self,
+        *,
+        flush_interval: float = 2.0,
+        max_queue_size: int = 500,
+        digest_threshold: int = 30,
+        metrics: Optional[FilterMetrics] = None,
+    ) -> None:
+        self.flush_interval = flush_interval
+        self.max_queue_size = max_queue_size
+        self.digest_threshold = digest_threshold
+        self.metrics = metrics
+        self._queues: dict[int, GuildHitQueue] = {}
+        self._closed = False
+
+    def enqueue(
+        self,
+        guild: discord.Guild,
+        channel: discord.abc.Messageable,
+        hit: FilterHit,
+    ) -> None:
+        """Queue ``hit`` for ``channel`` and make sure a flusher is running."""
+        if self._closed:
+            return
+        queue = self._queues.get(guild.id)
+        if queue is None:
+            queue = GuildHitQueue(channel=channel, guild_name=guild.name)
+            self._queues[guild.id] = queue
+        else:
+            queue.channel = channel
+            queue.guild_name = guild.name
+
+        if len(queue.hits) >= self.max_queue_size:
+            queue.dropped += 1
+        else:
+            queue.hits.append(hit)
+
+        if queue.task is None or queue.task.done():
+            queue.task = asyncio.create_task(self._flush_loop(guild.id))
+
+    async def close(self) -> None:
+        """Cancel every flusher and discard anything still queued."""
+        self._closed = True
+        tasks = [
+            queue.task
+            for queue in self._queues.values()
+            if queue.task is not None and not queue.task.done()
+        ]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._queues.clear()
+
+    async def _flush_loop(self, guild_id: int) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            queue = self._queues.get(guild_id)
+            if queue is None:
+                return
+            if not queue.hits:
+                self._queues.pop(guild_id, None)
+                return
+
+            hits = list(queue.hits)
+            dropped = queue.dropped
+            queue.hits.clear()
+            queue.dropped = 0
+            if dropped:
+                log.warning(
+                    "Dropped %s filter log entries in guild %s; queue was full",
+                    dropped,
+                    guild_id,
+                )
+
+            started = time.perf_counter()
+            failed = True
+            try:
+                await self._send(queue, hits, dropped)
+                failed = False
+            except asyncio.CancelledError:
+                raise
+            except discord.Forbidden:
+                pass
+            except discord.HTTPException:
+                log.exception(
+                    "Failed to send %s filter log entries in guild %s",
+                    len(hits),
+                    guild_id,
+                )
+            finally:
+                if self.metrics is not None:
+                    self.metrics.guild(guild_id).logs.record(
+                        time.perf_counter() - started, failed
+                    )
+
+    async def _send(
+        self, queue: GuildHitQueue, hits: list[FilterHit], dropped: int
+    ) -> None:
+        if not hits:
+            return
+        if dropped or len(hits) > self.digest_threshold:
+            await queue.channel.send(
+                embed=digest_embed(hits, dropped, queue.guild_name),
+                allowed_mentions=discord.AllowedMentions.none(),
+            )
+            return
+        for start in range(0, len(hits), MAX_EMBEDS_PER_MESSAGE):
+            chunk = hits[start : start + MAX_EMBEDS_PER_MESSAGE]
+            await queue.channel.send(
+                embeds=[hit_embed(hit, queue.guild_name) for hit in chunk],
+                allowed_mentions=discord.AllowedMentions.none(),
+            )
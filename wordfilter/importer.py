@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import csv
+import io
+from collections.abc import AsyncIterator, Iterable
+
+import aiohttp
+import discord
+
+
+# Large imported lists are fine, but refuse anything that is clearly not a
+# word list before downloading it.
+MAX_IMPORT_BYTES = 16 * 1024 * 1024
+
+
+class FilterImportError(Exception):
+    """Raised when an attachment cannot be imported as a filter list."""
+
+
+def is_csv(attachment: discord.Attachment) -> bool:
+    """Return whether ``attachment`` should be parsed as CSV."""
+    content_type = (attachment.content_type or "").split(";")[0].strip()
+    return attachment.filename.lower().endswith(".csv") or content_type == "text/csv"
+
+
+async def iter_attachment_entries(
+    attachment: discord.Attachment,
+) -> AsyncIterator[str]:
+    """Stream raw filter entries from a text or CSV attachment.
+
+    Text files contribute one entry per line. CSV files contribute the
+    first column of every row, so exports with extra metadata columns can
+    be imported as they are.
+    """
+    if attachment.size > MAX_IMPORT_BYTES:
+        raise FilterImportError(
+            f"Attachments larger than {MAX_IMPORT_BYTES // (1024 * 1024)} MiB "
+            "cannot be imported."
+        )
+
+    parse_csv = is_csv(attachment)
+    first = True
+    async with aiohttp.ClientSession() as session:
+        async with session.get(attachment.url) as response:
+            if response.status != 200:
+                raise FilterImportError(
+                    f"Downloading the attachment failed with HTTP {response.status}."
+                )
+            # Read line by line so huge lists never sit in memory twice.
+            try:
+                async for raw_line in response.content:
+                    line = raw_line.decode("utf-8", errors="replace")
+                    if first:
+                        line = line.lstrip("\ufeff")
+                        first = False
+                    line = line.rstrip("\r\n")
+                    if not line:
+                        continue
+                    if parse_csv:
+                        row = next(csv.reader([line]), None)
+                        if not row:
+                            continue
+                        line = row[0]
+                    yield line
+            except ValueError:
+                raise FilterImportError(
+                    "The attachment contains a line that is too long."
+                ) from None
+
+
+def export_file(words: Iterable[str], filename: str) -> discord.File:
+    """Render ``words`` as a sorted, newline-separated text attachment."""
+    data = "\n".join(sorted(words)).encode("utf-8")
+    return discord.File(io.BytesIO(data), filename=filename)
@@ -0,0 +1,767 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+import weakref
+from array import array
+from bisect import bisect_left
+from typing import AbstractSet, Callable, Iterable, Optional
+
+from .bloom import AnchorPrefilter
+from .patterns import PatternSet, glob_parts, is_wildcard
+
+
+NO_EXCLUSIONS: frozenset[str] = frozenset()
+
+# A maximal run of word characters. A filter made only of word characters
+# satisfies ``\b{entry}\b`` exactly when it equals one of these runs.
+WORD_TOKEN = re.compile(r"\w+")
+
+
+def entry_pattern(entry: str) -> str:
+    """Return the regex source used to match a single filter entry.
+
+    Phrases (entries containing a space) match as plain substrings, while
+    single words must sit on word boundaries.
+    """
+    escaped = re.escape(entry)
+    if " " in entry:
+        return escaped
+    return rf"\b{escaped}\b"
+
+
+def _sorted_contains(entries: tuple[str, ...], entry: str) -> bool:
+    position = bisect_left(entries, entry)
+    return position != len(entries) and entries[position] == entry
+
+
+def _most_specific_first(entries: Iterable[str]) -> list[str]:
+    # Longest entries first so the reported filter is the most specific
+    # one when several alternatives match at the same position.
+    return sorted(entries, key=lambda entry: (-len(entry), entry))
+
+
+class RegexMatcher:
+    """A guild's filter list compiled into one alternation pattern."""
+
+    __slots__ = ("entries", "_pattern")
+
+    def __init__(self, entries: Iterable[str]) -> None:
+        # Entries arrive folded by ``FilterMatcher``; they are not copied.
+        unique = {entry for entry in entries if entry}
+        self.entries: tuple[str, ...] = tuple(sorted(unique))
+        self._pattern: Optional[re.Pattern[str]] = None
+        if self.entries:
+            self._pattern = re.compile(
+                "|".join(
+                    entry_pattern(entry)
+                    for entry in _most_specific_first(self.entries)
+                )
+            )
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, entry: str) -> bool:
+        return _sorted_contains(self.entries, entry)
+
+    def find(
+        self, content: str, exclude: AbstractSet[str] = NO_EXCLUSIONS
+    ) -> Optional[str]:
+        """Return the first filter matched in lowercased ``content``.
+
+        Entries in ``exclude`` are treated as removed.
+        """
+        if self._pattern is None:
+            return None
+        match = self._pattern.search(content)
+        while match is not None:
+            # Neither kind of alternative consumes extra characters, so the
+            # matched text is always the filter entry itself.
+            entry = match.group(0)
+            if entry not in exclude:
+                return entry
+            # A removed entry shadows the shorter alternatives at the same
+            # position, which are all prefixes of it. Check those, then
+            # carry on searching after this position.
+            start = match.start()
+            for end in range(len(entry) - 1, 0, -1):
+                prefix = entry[:end]
+                if (
+                    prefix not in exclude
+                    and _sorted_contains(self.entries, prefix)
+                    and (
+                        " " in prefix
+                        or on_word_boundaries(content, start, start + end)
+                    )
+                ):
+                    return prefix
+            match = self._pattern.search(content, start + 1)
+        return None
+
+
+def is_word_char(character: str) -> bool:
+    """Mirror the ``\\w`` class ``re`` uses for ``str`` patterns."""
+    return character.isalnum() or character == "_"
+
+
+def on_word_boundaries(content: str, start: int, end: int) -> bool:
+    """Return whether ``content[start:end]`` matches ``\\b...\\b``."""
+    before = start > 0 and is_word_char(content[start - 1])
+    after = end < len(content) and is_word_char(content[end])
+    return (
+        before != is_word_char(content[start])
+        and is_word_char(content[end - 1]) != after
+    )
+
+
+def build_automaton(
+    entries: Iterable[str],
+) -> tuple[list[dict[str, int]], list[int], list[Optional[str]], list[int]]:
+    """Build Aho-Corasick goto, failure, output and output-link tables.
+
+    States are numbered breadth-first from the root, which is state 0.
+    """
+    goto: list[dict[str, int]] = [{}]
+    output: list[Optional[str]] = [None]
+    for entry in entries:
+        state = 0
+        for character in entry:
+            next_state = goto[state].get(character)
+            if next_state is None:
+                next_state = len(goto)
+                goto[state][character] = next_state
+                goto.append({})
+                output.append(None)
+            state = next_state
+        output[state] = entry
+
+    # Breadth-first pass computing failure links and, for every state, the
+    # nearest state along its failure chain that ends a filter.
+    fail = [0] * len(goto)
+    output_link = [0] * len(goto)
+    queue = list(goto[0].values())
+    for state in queue:
+        for character, next_state in goto[state].items():
+            fallback = fail[state]
+            while fallback and character not in goto[fallback]:
+                fallback = fail[fallback]
+            target = goto[fallback].get(character, 0)
+            fail[next_state] = target
+            output_link[next_state] = (
+                target if output[target] is not None else output_link[target]
+            )
+            queue.append(next_state)
+
+    return goto, fail, output, output_link
+
+
+def build_trie(entries: Iterable[str]) -> tuple[list[dict[str, int]], bytearray]:
+    """Build a plain trie: goto tables and a flag for states ending an entry."""
+    goto: list[dict[str, int]] = [{}]
+    terminal = bytearray(1)
+    for entry in entries:
+        state = 0
+        for character in entry:
+            next_state = goto[state].get(character)
+            if next_state is None:
+                next_state = len(goto)
+                goto[state][character] = next_state
+                goto.append({})
+                terminal.append(0)
+            state = next_state
+        terminal[state] = 1
+    return goto, terminal
+
+
+def flatten_edges(goto: list[dict[str, int]]) -> tuple[array, array, array]:
+    """Store every state's edges contiguously, sorted by code point.
+
+    Returns the offset of each state's first edge (plus a final end
+    offset), and the code point and target state of every edge.
+    """
+    edge_start = array("I", [0])
+    edge_char = array("I")
+    edge_target = array("I")
+    for edges in goto:
+        for character in sorted(edges):
+            edge_char.append(ord(character))
+            edge_target.append(edges[character])
+        edge_start.append(len(edge_char))
+    return edge_start, edge_char, edge_target
+
+
+class AhoCorasickMatcher:
+    """A guild's filter list compiled into an Aho-Corasick automaton.
+
+    Scanning is linear in the message length no matter how many filters
+    are configured, which keeps very large imported lists affordable.
+    """
+
+    __slots__ = ("entries", "_goto", "_fail", "_output", "_output_link")
+
+    def __init__(self, entries: Iterable[str]) -> None:
+        unique = {entry for entry in entries if entry}
+        self.entries: tuple[str, ...] = tuple(sorted(unique))
+        (
+            self._goto,
+            self._fail,
+            self._output,
+            self._output_link,
+        ) = build_automaton(self.entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, entry: str) -> bool:
+        return _sorted_contains(self.entries, entry)
+
+    def find(
+        self, content: str, exclude: AbstractSet[str] = NO_EXCLUSIONS
+    ) -> Optional[str]:
+        """Return the first filter matched in lowercased ``content``.
+
+        Entries in ``exclude`` are treated as removed.
+        """
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        output_link = self._output_link
+        state = 0
+        for index, character in enumerate(content):
+            while state and character not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(character, 0)
+            node = state if output[state] is not None else output_link[state]
+            while node:
+                entry = output[node]
+                # Phrases match anywhere, single words only on boundaries,
+                # exactly like the per-entry patterns of ``RegexMatcher``.
+                if entry not in exclude and (
+                    " " in entry
+                    or on_word_boundaries(content, index + 1 - len(entry), index + 1)
+                ):
+                    return entry
+                node = output_link[node]
+        return None
+
+
+class CompactTrieMatcher:
+    """An Aho-Corasick automaton frozen into flat integer arrays.
+
+    Each state's outgoing edges are stored contiguously and sorted by code
+    point, so a transition is a binary search instead of a dict lookup.
+    That is slower per character than ``AhoCorasickMatcher``, but a state
+    costs a few machine integers instead of a dict, which keeps lists of
+    hundreds of thousands of entries small enough to share across guilds.
+    """
+
+    __slots__ = (
+        "entries",
+        "_edge_start",
+        "_edge_char",
+        "_edge_target",
+        "_fail",
+        "_output",
+        "_output_link",
+    )
+
+    def __init__(self, entries: Iterable[str]) -> None:
+        unique = {entry for entry in entries if entry}
+        self.entries: tuple[str, ...] = tuple(sorted(unique))
+        goto, fail, output, output_link = build_automaton(self.entries)
+        self._edge_start, self._edge_char, self._edge_target = flatten_edges(goto)
+        del goto
+
+        index = {entry: position for position, entry in enumerate(self.entries)}
+        self._fail = array("I", fail)
+        self._output = array(
+            "i", [-1 if entry is None else index[entry] for entry in output]
+        )
+        self._output_link = array("I", output_link)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, entry: str) -> bool:
+        return _sorted_contains(self.entries, entry)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate size of the automaton tables in bytes."""
+        return sum(
+            table.itemsize * len(table)
+            for table in (
+                self._edge_start,
+                self._edge_char,
+                self._edge_target,
+                self._fail,
+                self._output,
+                self._output_link,
+            )
+        )
+
+    def _step(self, state: int, code: int) -> int:
+        edge_start = self._edge_start
+        edge_char = self._edge_char
+        fail = self._fail
+        while True:
+            low = edge_start[state]
+            high = edge_start[state + 1]
+            if low != high:
+                position = bisect_left(edge_char, code, low, high)
+                if position != high and edge_char[position] == code:
+                    return self._edge_target[position]
+            if not state:
+                return 0
+            state = fail[state]
+
+    def find(
+        self, content: str, exclude: AbstractSet[str] = NO_EXCLUSIONS
+    ) -> Optional[str]:
+        """Return the first filter matched in lowercased ``content``.
+
+        Entries in ``exclude`` are treated as removed.
+        """
+        if not self.entries:
+            return None
+        entries = self.entries
+        output = self._output
+        output_link = self._output_link
+        step = self._step
+        state = 0
+        for index, character in enumerate(content):
+            state = step(state, ord(character))
+            node = state if output[state] >= 0 else output_link[state]
+            while node:
+                entry = entries[output[node]]
+                if entry not in exclude and (
+                    " " in entry
+                    or on_word_boundaries(content, index + 1 - len(entry), index + 1)
+                ):
+                    return entry
+                node = output_link[node]
+        return None
+
+
+class CompactWordSet:
+    """Single-word filters stored as a trie in flat arrays.
+
+    Lookups walk one token's characters with the same binary-searched
+    edges as ``CompactTrieMatcher``, so a token costs a few bisects
+    instead of a hash, while shared prefixes are stored only once and no
+    string object is kept per entry.
+    """
+
+    __slots__ = ("_edge_start", "_edge_char", "_edge_target", "_terminal", "_count")
+
+    def __init__(self, words: Iterable[str]) -> None:
+        words = sorted({word for word in words if word})
+        goto, terminal = build_trie(words)
+        self._edge_start, self._edge_char, self._edge_target = flatten_edges(goto)
+        self._terminal = terminal
+        self._count = len(words)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, token: str) -> bool:
+        edge_start = self._edge_start
+        edge_char = self._edge_char
+        state = 0
+        for character in token:
+            code = ord(character)
+            low = edge_start[state]
+            high = edge_start[state + 1]
+            position = bisect_left(edge_char, code, low, high)
+            if position == high or edge_char[position] != code:
+                return False
+            state = self._edge_target[position]
+        return bool(self._terminal[state])
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate size of the trie tables in bytes."""
+        return len(self._terminal) + sum(
+            table.itemsize * len(table)
+            for table in (self._edge_start, self._edge_char, self._edge_target)
+        )
+
+
+def glob_match(segments: tuple[str, ...], token: str) -> bool:
+    """Return whether ``token`` matches a glob split on ``*`` into ``segments``.
+
+    Segments are located left to right with ``str.find``, so a check is
+    linear in the token length however the wildcards are arranged.
+    """
+    if len(segments) == 1:
+        return token == segments[0]
+    first = segments[0]
+    last = segments[-1]
+    end = len(token) - len(last)
+    if end < len(first) or not token.startswith(first) or not token.endswith(last):
+        return False
+    position = len(first)
+    for segment in segments[1:-1]:
+        position = token.find(segment, position, end)
+        if position < 0:
+            return False
+        position += len(segment)
+    return True
+
+
+class GlobMatcher:
+    """Wildcard entries matched against the message one token at a time.
+
+    ``*`` stands for any run of word characters, so each word of an entry
+    must equal one whole token and a phrase must match consecutive tokens
+    separated by single spaces. Nothing is compiled to a regex, which
+    keeps the cost linear in the message length. Entries that are not
+    usable globs are skipped; they still match literally elsewhere.
+    """
+
+    __slots__ = ("_by_initial", "_floating", "_phrases", "_count")
+
+    def __init__(self, entries: Iterable[str]) -> None:
+        by_initial: dict[str, list[tuple[str, tuple[str, ...]]]] = {}
+        floating: list[tuple[str, tuple[str, ...]]] = []
+        phrases: list[tuple[str, tuple[tuple[str, ...], ...]]] = []
+        for entry in sorted(set(entries)):
+            parts = glob_parts(entry)
+            if parts is None:
+                continue
+            if len(parts) > 1:
+                phrases.append((entry, parts))
+            elif parts[0][0]:
+                by_initial.setdefault(parts[0][0][0], []).append((entry, parts[0]))
+            else:
+                floating.append((entry, parts[0]))
+        self._by_initial = by_initial
+        self._floating = floating
+        self._phrases = phrases
+        self._count = len(phrases) + len(floating) + sum(map(len, by_initial.values()))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def find(
+        self, content: str, exclude: AbstractSet[str] = NO_EXCLUSIONS
+    ) -> Optional[str]:
+        """Return the first wildcard entry matched in lowercased ``content``."""
+        tokens = list(WORD_TOKEN.finditer(content))
+        if self._by_initial or self._floating:
+            for token in dict.fromkeys(match.group(0) for match in tokens):
+                for entry, segments in (
+                    *self._by_initial.get(token[0], ()),
+                    *self._floating,
+                ):
+                    if entry not in exclude and glob_match(segments, token):
+                        return entry
+        for entry, parts in self._phrases:
+            if entry in exclude:
+                continue
+            for start in range(len(tokens) - len(parts) + 1):
+                if self._phrase_at(content, tokens, start, parts):
+                    return entry
+        return None
+
+    @staticmethod
+    def _phrase_at(
+        content: str,
+        tokens: list[re.Match[str]],
+        start: int,
+        parts: tuple[tuple[str, ...], ...],
+    ) -> bool:
+        for offset, segments in enumerate(parts):
+            token = tokens[start + offset]
+            if offset:
+                gap = content[tokens[start + offset - 1].end() : token.start()]
+                if gap != " ":
+                    return False
+            if not glob_match(segments, token.group(0)):
+                return False
+        return True
+
+
+ENGINES = {
+    "regex": RegexMatcher,
+    "automaton": AhoCorasickMatcher,
+    "compact": CompactTrieMatcher,
+}
+
+DEFAULT_ENGINE = "regex"
+
+
+class SharedLists:
+    """The guild-independent, compiled part of a filter list.
+
+    Guilds whose folded lists are identical share one instance, so fifty
+    guilds loading the same 200k-entry list hold a single copy of the
+    token set, engine, prefilter and wildcard entries. The compact engine
+    stores single words in a ``CompactWordSet`` instead of a token set.
+    """
+
+    __slots__ = ("words", "phrases", "prefilter", "globs", "__weakref__")
+
+    def __init__(self, words: frozenset[str], others: frozenset[str], engine: str) -> None:
+        factory = ENGINES.get(engine, ENGINES[DEFAULT_ENGINE])
+        if factory is CompactTrieMatcher:
+            self.words: AbstractSet[str] = CompactWordSet(words)
+        else:
+            self.words = words
+        self.phrases = factory(others)
+        self.prefilter = AnchorPrefilter(others) if others else None
+        globs = GlobMatcher(entry for entry in others if is_wildcard(entry))
+        self.globs = globs if len(globs) else None
+
+
+_shared_lists: weakref.WeakValueDictionary[bytes, SharedLists] = (
+    weakref.WeakValueDictionary()
+)
+_shared_lists_lock = threading.Lock()
+
+
+def shared_lists(words: Iterable[str], others: Iterable[str], engine: str) -> SharedLists:
+    """Return the compiled lists for these folded entries, reusing live copies.
+
+    Lists are deduplicated by a SHA-256 digest of the engine name and the
+    sorted entries, and are freed once no guild's matcher references them.
+    """
+    words = frozenset(words)
+    others = frozenset(others)
+    digest = hashlib.sha256()
+    digest.update(engine.encode())
+    for group in (words, others):
+        digest.update(b"\x01")
+        for entry in sorted(group):
+            digest.update(entry.encode("utf-8", "surrogatepass"))
+            digest.update(b"\x00")
+    key = digest.digest()
+
+    with _shared_lists_lock:
+        cached = _shared_lists.get(key)
+    if cached is not None:
+        return cached
+
+    # Compile outside the lock; a concurrent duplicate build just loses.
+    built = SharedLists(words, others, engine)
+    with _shared_lists_lock:
+        return _shared_lists.setdefault(key, built)
+
+
+class FilterMatcher:
+    """Route single-word filters through a token set and the rest to an engine.
+
+    The message is tokenized once and each token costs one hash lookup, so
+    the common case of word filters no longer scales with the list size.
+    Phrases and entries containing non-word characters, whose boundary
+    behaviour a token set cannot reproduce, go to the configured engine
+    behind a Bloom prefilter that rejects most clean messages. Wildcard
+    entries are matched token by token, and also literally by the engine
+    so entries stored before wildcards existed keep working. Admin-supplied
+    regexes are scanned last, under a time budget. Everything except those
+    patterns is shared between guilds with identical lists.
+    """
+
+    __slots__ = ("_lists", "patterns", "collisions")
+
+    def __init__(
+        self,
+        entries: Iterable[str],
+        engine: str = DEFAULT_ENGINE,
+        normalizer: Optional[Callable[[str], str]] = None,
+        *,
+        regexes: Iterable[str] = (),
+        disabled: Optional[set[str]] = None,
+    ) -> None:
+        words = set()
+        others = set()
+        seen = set()
+        collisions = set()
+        for entry in entries:
+            entry = normalizer(entry) if normalizer else entry.lower()
+            if not entry:
+                continue
+            if entry in seen:
+                collisions.add(entry)
+            seen.add(entry)
+            if WORD_TOKEN.fullmatch(entry):
+                words.add(entry)
+            else:
+                others.add(entry)
+
+        self._lists = shared_lists(words, others, engine)
+        self.patterns = PatternSet(regexes, disabled=disabled)
+        # Folded forms shared by several raw entries, which removing one of
+        # them must not hide.
+        self.collisions: frozenset[str] = frozenset(collisions)
+
+    @property
+    def words(self) -> AbstractSet[str]:
+        return self._lists.words
+
+    @property
+    def phrases(self):
+        return self._lists.phrases
+
+    @property
+    def prefilter(self) -> Optional[AnchorPrefilter]:
+        return self._lists.prefilter
+
+    @property
+    def regex_bound(self) -> bool:
+        """Whether scans spend their time in ``re``, which holds the GIL."""
+        lists = self._lists
+        return bool(self.patterns) or (
+            isinstance(lists.phrases, RegexMatcher) and bool(lists.phrases)
+        )
+
+    def __len__(self) -> int:
+        return len(self.words) + len(self.phrases) + len(self.patterns)
+
+    def __contains__(self, entry: str) -> bool:
+        """Whether the folded ``entry`` is one of the compiled filters."""
+        lists = self._lists
+        return entry in lists.words or entry in lists.phrases
+
+    def find(
+        self,
+        content: str,
+        exclude: AbstractSet[str] = NO_EXCLUSIONS,
+        *,
+        plain: Optional[str] = None,
+    ) -> Optional[str]:
+        """Return the first filter matched in folded ``content``.
+
+        ``plain`` is the message merely lowercased, when folding changed
+        it. Filters are matched against both texts, so folding can only
+        add matches, and admin regexes only ever see ``plain``. Entries in
+        ``exclude`` are treated as removed.
+        """
+        lists = self._lists
+        texts = (content,) if plain is None or plain == content else (content, plain)
+        for text in texts:
+            matched = self._find_entries(lists, text, exclude)
+            if matched:
+                return matched
+        if self.patterns:
+            return self.patterns.find(content if plain is None else plain, exclude)
+        return None
+
+    @staticmethod
+    def _find_entries(
+        lists: SharedLists, content: str, exclude: AbstractSet[str]
+    ) -> Optional[str]:
+        words = lists.words
+        if words:
+            for token in WORD_TOKEN.findall(content):
+                if token in words and token not in exclude:
+                    return token
+        if lists.phrases and lists.prefilter.might_match(content):
+            matched = lists.phrases.find(content, exclude)
+            if matched:
+                return matched
+        if lists.globs is not None:
+            return lists.globs.find(content, exclude)
+        return None
+
+
+class OverlayMatcher:
+    """A compiled base matcher plus the edits made since it was built.
+
+    Added entries are compiled into a small delta matcher and removed ones
+    become tombstones that the base skips, so an admin edit takes effect
+    immediately without recompiling a huge list on the event loop. The
+    owner rebuilds the base in the background and swaps it in, which
+    empties the overlay again. Instances are immutable; edits return a
+    new overlay so scans running on worker threads never see a partial
+    update.
+    """
+
+    __slots__ = ("base", "delta", "added", "removed", "_engine", "_normalizer")
+
+    def __init__(
+        self,
+        base: FilterMatcher,
+        *,
+        engine: str = DEFAULT_ENGINE,
+        normalizer: Optional[Callable[[str], str]] = None,
+        added: AbstractSet[str] = NO_EXCLUSIONS,
+        removed: AbstractSet[str] = NO_EXCLUSIONS,
+    ) -> None:
+        self.base = base
+        self.added = frozenset(added)
+        self.removed = frozenset(removed)
+        self.delta = (
+            FilterMatcher(self.added, engine, normalizer) if self.added else None
+        )
+        self._engine = engine
+        self._normalizer = normalizer
+
+    def __len__(self) -> int:
+        delta = len(self.delta) if self.delta is not None else 0
+        return len(self.base) + delta - len(self.removed)
+
+    @property
+    def regex_bound(self) -> bool:
+        delta = self.delta
+        return self.base.regex_bound or (delta is not None and delta.regex_bound)
+
+    @property
+    def pending(self) -> int:
+        """How many edits are layered over the base."""
+        return len(self.added) + len(self.removed)
+
+    def _fold(self, entry: str) -> str:
+        return self._normalizer(entry) if self._normalizer else entry.lower()
+
+    def with_changes(
+        self, added: Iterable[str] = (), removed: Iterable[str] = ()
+    ) -> OverlayMatcher:
+        """Return a new overlay with raw ``added`` and ``removed`` entries applied."""
+        added = set(added)
+        removed = set(removed)
+        added_folded = {self._fold(entry) for entry in added}
+        # A folded form shared by several raw entries stays live until
+        # the next rebuild rather than risk hiding one that still exists.
+        tombstones = {
+            folded
+            for folded in (self._fold(entry) for entry in removed)
+            if folded in self.base and folded not in self.base.collisions
+        }
+        return OverlayMatcher(
+            self.base,
+            engine=self._engine,
+            normalizer=self._normalizer,
+            added=(self.added - removed) | added,
+            removed=(self.removed - added_folded) | tombstones,
+        )
+
+    def find(self, content: str, *, plain: Optional[str] = None) -> Optional[str]:
+        """Return the first filter matched in folded ``content``.
+
+        ``plain`` is passed on as described in :meth:`FilterMatcher.find`.
+        """
+        matched = self.base.find(content, self.removed, plain=plain)
+        if matched is None and self.delta is not None:
+            matched = self.delta.find(content, plain=plain)
+        return matched
+
+
+def build_matcher(
+    entries: Iterable[str],
+    engine: str = DEFAULT_ENGINE,
+    normalizer: Optional[Callable[[str], str]] = None,
+    *,
+    regexes: Iterable[str] = (),
+    disabled: Optional[set[str]] = None,
+) -> FilterMatcher:
+    """Compile ``entries`` with the named engine, falling back to the default.
+
+    When ``normalizer`` is given, entries are folded with it instead of
+    being lowercased, and messages must be folded with it as well.
+    """
+    return FilterMatcher(
+        entries, engine, normalizer, regexes=regexes, disabled=disabled
+    )
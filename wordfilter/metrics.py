@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import logging
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+log = logging.getLogger("red.xalvas.wordfilter")
+
+# Upper bounds of the latency histogram buckets, in milliseconds. A final
+# bucket collects everything slower.
+LATENCY_BUCKETS_MS = (
+    0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500,
+)
+
+# Seconds between structured log lines for one guild.
+LOG_INTERVAL = 300.0
+
+
+@dataclass
+class LatencyHistogram:
+    """Counts of observed latencies in fixed buckets."""
+
+    counts: list[int] = field(
+        default_factory=lambda: [0] * (len(LATENCY_BUCKETS_MS) + 1)
+    )
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+
+    def observe(self, seconds: float) -> None:
+        milliseconds = seconds * 1000
+        self.counts[bisect_left(LATENCY_BUCKETS_MS, milliseconds)] += 1
+        self.count += 1
+        self.total_ms += milliseconds
+        if milliseconds > self.max_ms:
+            self.max_ms = milliseconds
+
+    def percentile(self, fraction: float) -> float:
+        """Return the upper bound of the bucket holding the ``fraction`` quantile."""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                if index < len(LATENCY_BUCKETS_MS):
+                    return min(LATENCY_BUCKETS_MS[index], self.max_ms)
+                return self.max_ms
+        return self.max_ms
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_ms / self.count if self.count else 0.0
+
+
+@dataclass
+class ApiStats:
+    """Latency and failures of one kind of Discord API call."""
+
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+    failures: int = 0
+
+    def record(self, seconds: float, failed: bool = False) -> None:
+        self.latency.observe(seconds)
+        if failed:
+            self.failures += 1
+
+
+@dataclass
+class GuildMetrics:
+    """Counters for one guild since the cog was loaded."""
+
+    scanned: int = 0
+    exempt: int = 0
+    hits: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    scan_latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+    deletes: ApiStats = field(default_factory=ApiStats)
+    logs: ApiStats = field(default_factory=ApiStats)
+    started: float = field(default_factory=time.monotonic)
+    last_logged: float = field(default_factory=time.monotonic)
+
+    @property
+    def cache_hit_ratio(self) -> float:
+        lookups = self.cache_hits + self.cache_misses
+        return self.cache_hits / lookups if lookups else 0.0
+
+    def log_line(self, guild_id: int) -> str:
+        """Render the counters as ``key=value`` pairs for log aggregation."""
+        latency = self.scan_latency
+        return (
+            f"wordfilter_stats guild={guild_id} scanned={self.scanned}"
+            f" exempt={self.exempt} hits={self.hits}"
+            f" scan_p50_ms={latency.percentile(0.5):g}"
+            f" scan_p99_ms={latency.percentile(0.99):g}"
+            f" scan_max_ms={latency.max_ms:.3f}"
+            f" cache_hit_ratio={self.cache_hit_ratio:.3f}"
+            f" deletes={self.deletes.latency.count}"
+            f" delete_failures={self.deletes.failures}"
+            f" delete_p99_ms={self.deletes.latency.percentile(0.99):g}"
+            f" logs={self.logs.latency.count}"
+            f" log_failures={self.logs.failures}"
+            f" log_p99_ms={self.logs.latency.percentile(0.99):g}"
+        )
+
+
+class FilterMetrics:
+    """Per-guild performance counters for the scan, delete and log paths.
+
+    Each guild's counters are written to the log as one structured line at
+    most every ``log_interval`` seconds while it has traffic.
+    """
+
+    def __init__(self, *, log_interval: float = LOG_INTERVAL) -> None:
+        self.log_interval = log_interval
+        self._guilds: dict[int, GuildMetrics] = {}
+
+    def guild(self, guild_id: int) -> GuildMetrics:
+        metrics = self._guilds.get(guild_id)
+        if metrics is None:
+            metrics = self._guilds[guild_id] = GuildMetrics()
+        return metrics
+
+    def get(self, guild_id: int) -> Optional[GuildMetrics]:
+        return self._guilds.get(guild_id)
+
+    def reset(self, guild_id: int) -> None:
+        self._guilds.pop(guild_id, None)
+
+    def record_scan(
+        self, guild_id: int, seconds: float, matched: bool, cache_hit: bool
+    ) -> None:
+        metrics = self.guild(guild_id)
+        metrics.scanned += 1
+        metrics.scan_latency.observe(seconds)
+        if matched:
+            metrics.hits += 1
+        if cache_hit:
+            metrics.cache_hits += 1
+        else:
+            metrics.cache_misses += 1
+
+        now = time.monotonic()
+        if now - metrics.last_logged >= self.log_interval:
+            metrics.last_logged = now
+            log.info(metrics.log_line(guild_id))
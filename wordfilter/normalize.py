@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import re
+import sys
+import unicodedata
+from functools import cache, lru_cache
+
+
+# Only strings up to this length are remembered; longer messages are rare
+# and would make the cache's memory use unpredictable.
+MAX_CACHED_LENGTH = 512
+
+# Digits and symbols commonly substituted for letters. They are only
+# folded inside a run that also contains letters, so numbers, prices and
+# punctuation such as "1 + 1", "$5" or a closing "!" keep their meaning.
+LEETSPEAK = {
+    "0": "o",
+    "1": "i",
+    "3": "e",
+    "4": "a",
+    "5": "s",
+    "7": "t",
+    "8": "b",
+    "@": "a",
+    "$": "s",
+    "!": "i",
+    "|": "l",
+    "+": "t",
+}
+
+# Cyrillic and Greek letters that render identically to their Latin
+# counterparts, folded everywhere after case folding.
+LOOKALIKES = {
+    "а": "a",
+    "в": "b",
+    "е": "e",
+    "к": "k",
+    "м": "m",
+    "н": "h",
+    "о": "o",
+    "р": "p",
+    "с": "c",
+    "т": "t",
+    "у": "y",
+    "х": "x",
+    "і": "i",
+    "ј": "j",
+    "ѕ": "s",
+    "α": "a",
+    "β": "b",
+    "ε": "e",
+    "ι": "i",
+    "κ": "k",
+    "ν": "v",
+    "ο": "o",
+    "ρ": "p",
+    "τ": "t",
+    "υ": "u",
+    "χ": "x",
+}
+
+LEETSPEAK_TABLE = str.maketrans(LEETSPEAK)
+LOOKALIKES_TABLE = str.maketrans(LOOKALIKES)
+
+_LEETSPEAK_CHARACTER = re.compile("[" + re.escape("".join(LEETSPEAK)) + "]")
+
+# A run of word characters and leetspeak symbols, such as "h3ll0" or "$h!t".
+_LEETSPEAK_RUN = re.compile(r"[\w" + re.escape("".join(LEETSPEAK)) + "]+")
+
+
+@cache
+def strip_table() -> dict[int, None]:
+    """Return a translate table deleting every format and nonspacing mark.
+
+    Format characters (``Cf``) include zero-width joiners and directional
+    marks, and nonspacing marks (``Mn``) are the diacritics split off by
+    decomposition. The table is built once, on first use.
+    """
+    return {
+        codepoint: None
+        for codepoint in range(sys.maxunicode + 1)
+        if unicodedata.category(chr(codepoint)) in ("Cf", "Mn")
+    }
+
+
+def _fold_leetspeak(match: re.Match[str]) -> str:
+    run = match.group(0)
+    # A trailing "!" ends a sentence far more often than it spells an "i".
+    body = run.rstrip("!")
+    if not any(character.isalpha() for character in body):
+        return run
+    return body.translate(LEETSPEAK_TABLE) + run[len(body):]
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text).translate(strip_table())
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = text.translate(LOOKALIKES_TABLE)
+    if _LEETSPEAK_CHARACTER.search(text) is None:
+        return text
+    return _LEETSPEAK_RUN.sub(_fold_leetspeak, text)
+
+
+_normalize_cached = lru_cache(maxsize=4096)(_normalize)
+
+
+def normalize_text(text: str) -> str:
+    """Fold ``text`` so evasive spellings compare equal to plain ones.
+
+    Compatibility characters such as fullwidth letters are decomposed,
+    invisible characters and diacritics are removed, and the result is
+    case folded with confusable letters mapped to ASCII. Leetspeak digits
+    and symbols are mapped only within words. Filters and messages must go
+    through the same function.
+    """
+    if len(text) <= MAX_CACHED_LENGTH:
+        return _normalize_cached(text)
+    return _normalize(text)
@@ -0,0 +1,355 @@
+from __future__ import annotations
+
+import logging
+import re
+import time
+from collections.abc import Iterable
+from typing import AbstractSet, Optional
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+
+log = logging.getLogger("red.xalvas.wordfilter")
+
+MAX_PATTERN_LENGTH = 200
+MAX_COUNTED_REPEAT = 100
+
+# More wildcards than this in one entry are treated as literal ``*``.
+MAX_WILDCARDS = 4
+
+# A single pattern may spend this long on one message. Patterns that blow
+# the budget ``MAX_STRIKES`` times, or ``MAX_OVERRUN`` times over on one
+# message, are disabled for the guild.
+DEFAULT_SCAN_BUDGET = 0.005
+MAX_STRIKES = 3
+MAX_OVERRUN = 20
+
+_REPEATS = {sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT}
+if hasattr(sre_parse, "POSSESSIVE_REPEAT"):
+    _REPEATS.add(sre_parse.POSSESSIVE_REPEAT)
+_BACKREFERENCES = {sre_parse.GROUPREF, sre_parse.GROUPREF_EXISTS}
+
+# Repeats that give text back while backtracking. Possessive repeats
+# never do, so they are not counted among them.
+_BACKTRACKING_REPEATS = {sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT}
+_SINGLE_CHARACTERS = {
+    sre_parse.LITERAL,
+    sre_parse.NOT_LITERAL,
+    sre_parse.IN,
+    sre_parse.ANY,
+}
+
+# Characters tried when deciding whether two repeated character classes
+# can match the same text: Latin, its extensions and a few other scripts
+# and spaces. Classes that only overlap elsewhere are rare in filters.
+_SAMPLE = frozenset(
+    [chr(codepoint) for codepoint in range(0x250)]
+    + list("\u00a0\u2003\u3000\u0430\u03b1\u05d0\u0661\u4e00\U0001f600")
+)
+_CATEGORIES = {
+    category: frozenset(filter(re.compile(source).fullmatch, _SAMPLE))
+    for category, source in (
+        (sre_parse.CATEGORY_DIGIT, r"\d"),
+        (sre_parse.CATEGORY_NOT_DIGIT, r"\D"),
+        (sre_parse.CATEGORY_SPACE, r"\s"),
+        (sre_parse.CATEGORY_NOT_SPACE, r"\S"),
+        (sre_parse.CATEGORY_WORD, r"\w"),
+        (sre_parse.CATEGORY_NOT_WORD, r"\W"),
+    )
+}
+
+# A word of a glob entry: word characters and ``*``, at least one literal.
+_GLOB_WORD = re.compile(r"\**\w[\w*]*")
+_STARS = re.compile(r"\*+")
+
+
+class UnsafePatternError(ValueError):
+    """Raised for patterns that are invalid or prone to catastrophic backtracking."""
+
+
+def is_wildcard(entry: str) -> bool:
+    """Return whether a filter entry uses glob-style ``*`` wildcards."""
+    return "*" in entry
+
+
+def glob_parts(entry: str) -> Optional[tuple[tuple[str, ...], ...]]:
+    """Split a glob-style entry such as ``fr*ee n*tro`` for token matching.
+
+    Returns one tuple per space-separated word, holding the literal
+    segments around its ``*``, or ``None`` when the entry is not a usable
+    glob: every word must be word characters and ``*`` with at least one
+    literal character, and at most ``MAX_WILDCARDS`` ``*`` are allowed.
+    """
+    words = entry.split(" ")
+    if entry.count("*") > MAX_WILDCARDS or not all(
+        _GLOB_WORD.fullmatch(word) for word in words
+    ):
+        return None
+    return tuple(tuple(_STARS.split(word)) for word in words)
+
+
+def _walk(parsed, inside_repeat: bool) -> None:
+    for op, argument in parsed:
+        if op in _BACKREFERENCES:
+            raise UnsafePatternError("Backreferences are not allowed.")
+        if op in _REPEATS:
+            low, high, body = argument
+            bound = low if high == sre_parse.MAXREPEAT else high
+            if bound > MAX_COUNTED_REPEAT:
+                raise UnsafePatternError(
+                    f"Counted repeats above {MAX_COUNTED_REPEAT} are not allowed."
+                )
+            repeats = high > 1
+            if repeats and inside_repeat:
+                raise UnsafePatternError(
+                    "Nested quantifiers such as `(a+)+` are not allowed."
+                )
+            _walk(body, inside_repeat or repeats)
+        elif op == sre_parse.BRANCH:
+            if inside_repeat:
+                raise UnsafePatternError(
+                    "Alternations inside a repeated group are not allowed."
+                )
+            for branch in argument[1]:
+                _walk(branch, inside_repeat)
+        elif op == sre_parse.SUBPATTERN:
+            _walk(argument[-1], inside_repeat)
+        elif op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            _walk(argument[1], inside_repeat)
+        elif op == getattr(sre_parse, "ATOMIC_GROUP", None):
+            _walk(argument, inside_repeat)
+
+
+def _cased(codepoint: int) -> set[str]:
+    character = chr(codepoint)
+    # Patterns are compiled case-insensitively.
+    return {character, character.lower(), character.upper()}
+
+
+def _characters(body) -> Optional[frozenset[str]]:
+    """Return the characters a one-character ``body`` matches, or ``None``.
+
+    ``None`` means the body is not a single character or class, and must
+    be assumed to overlap with anything. Negated classes are resolved
+    against ``_SAMPLE``.
+    """
+    if len(body) != 1 or body[0][0] not in _SINGLE_CHARACTERS:
+        return None
+    op, argument = body[0]
+    if op == sre_parse.LITERAL:
+        return frozenset(_cased(argument))
+    if op == sre_parse.NOT_LITERAL:
+        return _SAMPLE - _cased(argument)
+    if op == sre_parse.ANY:
+        return _SAMPLE - {"\n"}
+    characters: set[str] = set()
+    negate = False
+    for item_op, item in argument:
+        if item_op == sre_parse.NEGATE:
+            negate = True
+        elif item_op == sre_parse.LITERAL:
+            characters |= _cased(item)
+        elif item_op == sre_parse.RANGE:
+            low, high = item
+            if high - low > len(_SAMPLE):
+                characters |= {
+                    character
+                    for character in _SAMPLE
+                    if low <= ord(character) <= high
+                }
+            else:
+                for codepoint in range(low, high + 1):
+                    characters |= _cased(codepoint)
+        elif item_op == sre_parse.CATEGORY and item in _CATEGORIES:
+            characters |= _CATEGORIES[item]
+        else:
+            return None
+    if negate:
+        return _SAMPLE - characters
+    return frozenset(characters)
+
+
+def _overlap(first: Optional[frozenset[str]], second: Optional[frozenset[str]]) -> bool:
+    return first is None or second is None or not first.isdisjoint(second)
+
+
+def _variable(op, low: int, high: int) -> bool:
+    """Return whether a repeat can give text back while backtracking.
+
+    Counted repeats such as ``\\w{1,100}`` backtrack just like ``\\w*``;
+    exact counts such as ``\\d{3}`` and possessive repeats have a single
+    way to match.
+    """
+    return op in _BACKTRACKING_REPEATS and high > 1 and low != high
+
+
+def _repeats(parsed, found: list[Optional[frozenset[str]]]) -> None:
+    """Append the character sets of every variable repeat in ``parsed``."""
+    for op, argument in parsed:
+        if op in _REPEATS:
+            low, high, body = argument
+            if _variable(op, low, high):
+                found.append(_characters(body))
+            _repeats(body, found)
+        elif op == sre_parse.BRANCH:
+            for branch in argument[1]:
+                _repeats(branch, found)
+        elif op == sre_parse.SUBPATTERN:
+            _repeats(argument[-1], found)
+        elif op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            _repeats(argument[1], found)
+
+
+def _sequence(parsed, floating: list[Optional[frozenset[str]]]) -> list[tuple]:
+    """Flatten ``parsed`` into ``(variable, characters, required)`` items.
+
+    Plain groups are inlined. Variable repeats whose position relative
+    to the rest is unclear, such as those inside alternations, optional
+    groups or lookarounds, go to ``floating`` instead.
+    """
+    items = []
+    for op, argument in parsed:
+        if op in _REPEATS:
+            low, high, body = argument
+            characters = _characters(body)
+            if _variable(op, low, high):
+                items.append((True, characters, low > 0))
+            else:
+                items.append((False, characters, low > 0))
+            _repeats(body, floating)
+        elif op in _SINGLE_CHARACTERS:
+            items.append((False, _characters([(op, argument)]), True))
+        elif op == sre_parse.SUBPATTERN:
+            items.extend(_sequence(argument[-1], floating))
+        elif op == sre_parse.BRANCH:
+            for branch in argument[1]:
+                _repeats(branch, floating)
+            items.append((False, None, False))
+        elif op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            _repeats(argument[1], floating)
+    return items
+
+
+def _check_repeats(parsed) -> None:
+    """Reject variable repeats that can split the same text between them.
+
+    In ``\\w*\\w*!`` every way of dividing a run of letters between the two
+    repeats is tried before the match fails, which is polynomial in the
+    message length. Counted repeats are no better: ``\\w{1,100}`` three
+    times over tries up to a million splits at every position. Two repeats
+    are safe when their characters are disjoint, or when a required
+    character between them is something the first repeat cannot match.
+    """
+    floating: list[Optional[frozenset[str]]] = []
+    items = _sequence(parsed, floating)
+    error = UnsafePatternError(
+        "Repeats that can match the same text one after another, such as "
+        "`\\w*\\w*`, `\\w{1,9}\\w{1,9}` or `.*a.*`, are not allowed."
+    )
+
+    repeats = [index for index, item in enumerate(items) if item[0]]
+    for position, first in enumerate(repeats):
+        characters = items[first][1]
+        for second in repeats[position + 1 :]:
+            if not _overlap(characters, items[second][1]):
+                continue
+            separated = characters is not None and any(
+                required
+                and separator is not None
+                and separator.isdisjoint(characters)
+                for _variable_item, separator, required in items[first + 1 : second]
+            )
+            if not separated:
+                raise error
+
+    everything = [items[index][1] for index in repeats] + floating
+    for position, characters in enumerate(floating, start=len(repeats)):
+        for index, other in enumerate(everything):
+            if index != position and _overlap(characters, other):
+                raise error
+
+
+def validate_pattern(source: str) -> re.Pattern[str]:
+    """Compile an admin-supplied pattern, rejecting backtracking hazards.
+
+    The check is deliberately conservative: it refuses backreferences,
+    any repeat that contains another repeat or an alternation, which are
+    the constructs behind exponential backtracking, and variable repeats
+    that can match the same text one after another, which backtrack
+    polynomially.
+    """
+    if len(source) > MAX_PATTERN_LENGTH:
+        raise UnsafePatternError(
+            f"Patterns may be at most {MAX_PATTERN_LENGTH} characters long."
+        )
+    try:
+        parsed = sre_parse.parse(source)
+        compiled = re.compile(source, re.IGNORECASE)
+    except re.error as error:
+        raise UnsafePatternError(f"Invalid pattern: {error}") from None
+    _walk(parsed, False)
+    _check_repeats(parsed)
+    return compiled
+
+
+class PatternSet:
+    """Admin-supplied regex filters scanned under a per-guild time budget.
+
+    ``disabled`` is shared with the owner so patterns stay disabled when
+    the set is rebuilt after the filter list changes.
+    """
+
+    __slots__ = ("_patterns", "_strikes", "disabled", "budget")
+
+    def __init__(
+        self,
+        regexes: Iterable[str] = (),
+        *,
+        disabled: Optional[set[str]] = None,
+        budget: float = DEFAULT_SCAN_BUDGET,
+    ) -> None:
+        patterns: list[tuple[str, re.Pattern[str]]] = []
+        for source in sorted(set(regexes)):
+            try:
+                patterns.append((source, validate_pattern(source)))
+            except UnsafePatternError:
+                # Stored before validation tightened; never run it.
+                log.warning("Skipping unsafe filter pattern %r", source)
+        self._patterns = patterns
+        self._strikes: dict[str, int] = {}
+        self.disabled = disabled if disabled is not None else set()
+        self.budget = budget
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    def find(self, content: str, exclude: AbstractSet[str] = frozenset()) -> Optional[str]:
+        """Return the first pattern matching ``content``, skipping ``exclude``."""
+        disabled = self.disabled
+        for label, pattern in self._patterns:
+            if label in disabled or label in exclude:
+                continue
+            started = time.perf_counter()
+            match = pattern.search(content)
+            elapsed = time.perf_counter() - started
+            if elapsed > self.budget:
+                self._strike(label, elapsed)
+            if match:
+                return label
+        return None
+
+    def _strike(self, label: str, elapsed: float) -> None:
+        strikes = self._strikes.get(label, 0) + 1
+        if elapsed > self.budget * MAX_OVERRUN:
+            strikes = MAX_STRIKES
+        self._strikes[label] = strikes
+        if strikes >= MAX_STRIKES:
+            self.disabled.add(label)
+            log.warning(
+                "Disabled filter pattern %r after it took %.1f ms on one message",
+                label,
+                elapsed * 1000,
+            )
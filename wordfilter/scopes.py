@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Optional
+
+from .matching import FilterMatcher
+
+
+@dataclass
+class Scope:
+    """Extra filters and exemptions for one channel or category."""
+
+    words: set[str] = field(default_factory=set)
+    exempt_roles: set[int] = field(default_factory=set)
+    exempt: bool = False
+
+    @classmethod
+    def from_config(cls, data: dict) -> Scope:
+        return cls(
+            words=set(data.get("words", ())),
+            exempt_roles=set(data.get("exempt_roles", ())),
+            exempt=data.get("exempt", False),
+        )
+
+    def to_config(self) -> dict:
+        return {
+            "words": sorted(self.words),
+            "exempt_roles": sorted(self.exempt_roles),
+            "exempt": self.exempt,
+        }
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.words or self.exempt_roles or self.exempt)
+
+
+@dataclass(frozen=True)
+class ScopeView:
+    """The filtering rules resolved for one channel.
+
+    ``key`` names the scopes that apply, so channels sharing a category and
+    its rules share one compiled ``matcher``. ``category_id`` records the
+    category the view was resolved under, which lets callers notice a
+    channel that has since been moved.
+    """
+
+    key: frozenset[int]
+    category_id: Optional[int]
+    exempt: bool
+    exempt_roles: frozenset[int]
+    matcher: Optional[FilterMatcher]
@@ -0,0 +1,374 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from collections.abc import Callable, Iterable
+from typing import Any, Optional
+
+from .fuzzy import FuzzyIndex
+from .matching import DEFAULT_ENGINE, FilterMatcher, OverlayMatcher, build_matcher
+from .normalize import normalize_text
+from .scopes import Scope, ScopeView
+from .shadow import DEFAULT_SAMPLE_RATE
+
+
+# Beyond this many layered edits the delta matcher itself becomes costly to
+# compile, so bulk changes wait for the background rebuild instead.
+MAX_OVERLAY_EDITS = 1000
+
+# Members whose exemption verdicts are remembered per guild. The member
+# seen least recently is forgotten first once the limit is reached.
+MAX_EXEMPT_MEMBERS = 10000
+
+
+@dataclass
+class GuildSettings:
+    """An in-memory snapshot of one guild's filter configuration.
+
+    Filter words are not kept here; they live in Config and, folded, in
+    the compiled matcher, which the owner builds with :meth:`compile_base`
+    and installs with :meth:`replace_base`.
+    """
+
+    word_count: int = 0
+    exempt_roles: frozenset[int] = frozenset()
+    log_channel: Optional[int] = None
+    engine: str = DEFAULT_ENGINE
+    normalize: bool = False
+    patterns: set[str] = field(default_factory=set)
+    disabled_patterns: set[str] = field(default_factory=set)
+    subscriptions: list[str] = field(default_factory=list)
+    fuzzy: dict[str, int] = field(default_factory=dict)
+    scopes: dict[int, Scope] = field(default_factory=dict)
+    shadow_engine: Optional[str] = None
+    shadow_rate: float = DEFAULT_SAMPLE_RATE
+    version: int = field(default=0, init=False)
+    _matcher: Any = field(default=None, init=False, repr=False)
+    _stale: bool = field(default=False, init=False, repr=False)
+    # Engine and normalization changes waiting for the next compiled base.
+    _pending: dict[str, Any] = field(default_factory=dict, init=False, repr=False)
+    _fuzzy_index: Optional[FuzzyIndex] = field(default=None, init=False, repr=False)
+    # Compiled in the background; ``None`` until ready or after an edit.
+    shadow_matcher: Optional[FilterMatcher] = field(
+        default=None, init=False, repr=False
+    )
+    _scope_views: dict[int, ScopeView] = field(
+        default_factory=dict, init=False, repr=False
+    )
+    _scope_matchers: dict[frozenset[int], FilterMatcher] = field(
+        default_factory=dict, init=False, repr=False
+    )
+    _exempt_members: OrderedDict[int, dict[frozenset[int], bool]] = field(
+        default_factory=OrderedDict, init=False, repr=False
+    )
+
+    @classmethod
+    def from_config(cls, data: dict) -> GuildSettings:
+        """Build a snapshot from the result of ``Config.guild(...).all()``."""
+        return cls(
+            word_count=len(data["words"]),
+            exempt_roles=frozenset(data["exempt_roles"]),
+            log_channel=data["log_channel"],
+            engine=data["engine"],
+            normalize=data["normalize"],
+            patterns=set(data["patterns"]),
+            disabled_patterns=set(data["disabled_patterns"]),
+            subscriptions=list(data["subscriptions"]),
+            fuzzy=dict(data["fuzzy"]),
+            scopes={
+                int(location_id): Scope.from_config(scope)
+                for location_id, scope in data["scopes"].items()
+            },
+            shadow_engine=data["shadow_engine"],
+            shadow_rate=data["shadow_rate"],
+        )
+
+    @property
+    def has_filters(self) -> bool:
+        """Whether any words, patterns, filter sets or scoped words are configured."""
+        return bool(
+            self.word_count
+            or self.patterns
+            or self.subscriptions
+            or any(scope.words for scope in self.scopes.values())
+        )
+
+    @property
+    def matcher(self) -> Optional[OverlayMatcher]:
+        """The compiled matcher, or ``None`` before the first base is installed."""
+        return self._matcher
+
+    @property
+    def fuzzy_index(self) -> Optional[FuzzyIndex]:
+        """The edit-distance index for ``fuzzy`` entries, or ``None``."""
+        if not self.fuzzy:
+            return None
+        if self._fuzzy_index is None:
+            self._fuzzy_index = FuzzyIndex(
+                self.fuzzy, normalize_text if self.normalize else None
+            )
+        return self._fuzzy_index
+
+    def scope_view(self, channel_id: int, category_id: Optional[int]) -> ScopeView:
+        """Return the rules for a channel, resolving them on first use.
+
+        Views are cached by channel ID, so a message costs one lookup no
+        matter how many scopes the guild defines. Scoped words are compiled
+        once per distinct combination of category and channel scope,
+        normally ahead of time by :meth:`compile_scopes`.
+        """
+        view = self._scope_views.get(channel_id)
+        if view is not None and view.category_id == category_id:
+            return view
+
+        location_ids = [
+            location_id
+            for location_id in (category_id, channel_id)
+            if location_id in self.scopes
+        ]
+        scopes = [self.scopes[location_id] for location_id in location_ids]
+        key = frozenset(location_ids)
+
+        matcher = self._scope_matchers.get(key)
+        if matcher is None:
+            matcher = self._build_scope_matcher(
+                scopes, self.engine, normalize_text if self.normalize else None
+            )
+            if matcher is not None:
+                self._scope_matchers[key] = matcher
+
+        view = ScopeView(
+            key=key,
+            category_id=category_id,
+            exempt=any(scope.exempt for scope in scopes),
+            exempt_roles=self.exempt_roles.union(
+                *(scope.exempt_roles for scope in scopes)
+            ),
+            matcher=matcher,
+        )
+        self._scope_views[channel_id] = view
+        return view
+
+    @staticmethod
+    def _build_scope_matcher(
+        scopes: Iterable[Scope],
+        engine: str,
+        normalizer: Optional[Callable[[str], str]],
+    ) -> Optional[FilterMatcher]:
+        words = set().union(*(scope.words for scope in scopes))
+        if not words:
+            return None
+        return build_matcher(words, engine, normalizer)
+
+    def compile_scopes(
+        self, keys: Iterable[frozenset[int]]
+    ) -> dict[frozenset[int], FilterMatcher]:
+        """Compile the scoped words for each combination of scopes in ``keys``.
+
+        Like :meth:`compile_base`, staged engine and normalization changes
+        are compiled in and only settings are read, so it may run on a
+        worker thread. Install the result with :meth:`install_scopes`.
+        """
+        scopes = self.scopes
+        engine = self._pending.get("engine", self.engine)
+        normalizer = normalize_text if self.next_normalize else None
+        matchers = {}
+        for key in keys:
+            matcher = self._build_scope_matcher(
+                [scopes[location_id] for location_id in key if location_id in scopes],
+                engine,
+                normalizer,
+            )
+            if matcher is not None:
+                matchers[key] = matcher
+        return matchers
+
+    def install_scopes(self, matchers: dict[frozenset[int], FilterMatcher]) -> None:
+        """Add scope matchers compiled for the live engine and folding."""
+        self._scope_matchers.update(matchers)
+
+    def is_exempt(
+        self,
+        member_id: int,
+        view: ScopeView,
+        role_ids: Callable[[], Optional[Iterable[int]]],
+    ) -> bool:
+        """Return whether a member is exempt under ``view``.
+
+        Verdicts are cached per member and scope combination, so
+        ``role_ids`` is only called the first time a member is seen. It may
+        return ``None`` when the member's roles are unknown, in which case
+        the member is not exempt and no verdict is cached. Call
+        :meth:`forget_member` when the member's roles change.
+        """
+        if not view.exempt_roles:
+            return False
+        members = self._exempt_members
+        verdicts = members.get(member_id)
+        if verdicts is not None:
+            members.move_to_end(member_id)
+            verdict = verdicts.get(view.key)
+            if verdict is not None:
+                return verdict
+        roles = role_ids()
+        if roles is None:
+            return False
+        verdict = not view.exempt_roles.isdisjoint(roles)
+        if verdicts is None:
+            if len(members) >= MAX_EXEMPT_MEMBERS:
+                members.popitem(last=False)
+            verdicts = members[member_id] = {}
+        verdicts[view.key] = verdict
+        return verdict
+
+    def forget_member(self, member_id: int) -> None:
+        """Drop cached exemption verdicts for one member."""
+        self._exempt_members.pop(member_id, None)
+
+    @property
+    def needs_rebuild(self) -> bool:
+        """Whether edits are layered over, or missing from, the compiled base."""
+        return self._matcher is not None and (self._stale or self._matcher.pending > 0)
+
+    @property
+    def next_normalize(self) -> bool:
+        """The normalization the next compiled base will use."""
+        return self._pending.get("normalize", self.normalize)
+
+    def stage(self, **changes: Any) -> None:
+        """Change settings the compiled base depends on.
+
+        ``engine`` and ``normalize`` take effect together with the base
+        compiled for them, and a pattern change made by the caller is
+        picked up by that compile too. Until then the current matcher
+        stays live and consistent with ``fold``. Without a compiled
+        matcher there is nothing to keep, so changes apply at once.
+        """
+        if self._matcher is None:
+            self._apply_pending(changes)
+        else:
+            self._pending.update(changes)
+            self._stale = True
+        self.version += 1
+
+    def _apply_pending(self, changes: dict[str, Any]) -> None:
+        for key, value in changes.items():
+            setattr(self, key, value)
+        if changes:
+            # Everything else compiled for the old engine or folding.
+            self._fuzzy_index = None
+            self._scope_views.clear()
+            self._scope_matchers.clear()
+            self.shadow_matcher = None
+
+    def compile_base(
+        self, words: Iterable[str], patterns: Iterable[str]
+    ) -> FilterMatcher:
+        """Compile a full matcher from snapshots of ``words`` and ``patterns``.
+
+        Staged engine and normalization changes are compiled in. Only
+        reads settings, so it may run on a worker thread.
+        """
+        return build_matcher(
+            words,
+            self._pending.get("engine", self.engine),
+            normalize_text if self.next_normalize else None,
+            regexes=patterns,
+            disabled=self.disabled_patterns,
+        )
+
+    def compile_shadow(
+        self, words: Iterable[str], patterns: Iterable[str]
+    ) -> FilterMatcher:
+        """Compile the shadow candidate like :meth:`compile_base`.
+
+        Pattern strikes are tracked on a copy of ``disabled_patterns``, so
+        slow candidate scans never disable patterns the guild enforces.
+        """
+        return build_matcher(
+            words,
+            self.shadow_engine,
+            normalize_text if self.normalize else None,
+            regexes=patterns,
+            disabled=set(self.disabled_patterns),
+        )
+
+    def replace_base(self, base: FilterMatcher) -> None:
+        """Swap in a freshly compiled base, discarding the overlay.
+
+        Staged changes, which the base was compiled with, apply now.
+        """
+        if self._pending:
+            self._apply_pending(self._pending)
+            self._pending = {}
+            self.version += 1
+        self._matcher = OverlayMatcher(
+            base,
+            engine=self.engine,
+            normalizer=normalize_text if self.normalize else None,
+        )
+        self._stale = False
+
+    def apply_word_changes(
+        self, added: Iterable[str] = (), removed: Iterable[str] = ()
+    ) -> None:
+        """Apply filter edits immediately by layering them over the base.
+
+        Bulk edits larger than ``MAX_OVERLAY_EDITS`` leave the current
+        matcher in place and only take effect after the background rebuild.
+        """
+        added = set(added)
+        removed = set(removed)
+        # Callers only pass entries that were actually added or removed.
+        self.word_count += len(added) - len(removed)
+        self.shadow_matcher = None
+        if removed & self.fuzzy.keys():
+            self.fuzzy = {
+                entry: distance
+                for entry, distance in self.fuzzy.items()
+                if entry not in removed
+            }
+            self._fuzzy_index = None
+        if self._matcher is not None and not self._stale:
+            if self._matcher.pending + len(added) + len(removed) > MAX_OVERLAY_EDITS:
+                self._stale = True
+            else:
+                self._matcher = self._matcher.with_changes(added, removed)
+        self.version += 1
+
+    def clear_words(self) -> None:
+        """Drop every filter word, keeping patterns and staged changes."""
+        self.word_count = 0
+        self.fuzzy = {}
+        self._fuzzy_index = None
+        self.shadow_matcher = None
+        if self._matcher is not None:
+            # Only patterns are left, which compile in no time.
+            self.replace_base(self.compile_base((), self.patterns))
+        self.version += 1
+
+    def fold(self, content: str) -> str:
+        """Prepare message content exactly like the matcher's filters."""
+        if self.normalize:
+            return normalize_text(content)
+        return content.lower()
+
+    def invalidate_fuzzy(self) -> None:
+        """Drop the fuzzy index so the next scan rebuilds it."""
+        self._fuzzy_index = None
+        self.version += 1
+
+    def invalidate_scopes(self) -> None:
+        """Drop resolved channel rules, scoped matchers and exemption verdicts."""
+        self._scope_views.clear()
+        self._scope_matchers.clear()
+        self._exempt_members.clear()
+        self.version += 1
+
+    def invalidate_exemptions(self) -> None:
+        """Drop resolved channel rules and exemption verdicts after a role edit.
+
+        Scoped matchers do not depend on exempt roles, so they are kept.
+        """
+        self._scope_views.clear()
+        self._exempt_members.clear()
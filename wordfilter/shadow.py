@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import random
+import statistics
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Optional
+
+from .matching import FilterMatcher
+
+
+DEFAULT_SAMPLE_RATE = 0.05
+
+# Bounds of the ring buffers kept per guild.
+MAX_DISAGREEMENTS = 50
+MAX_TIMINGS = 1000
+
+
+@dataclass(frozen=True)
+class Disagreement:
+    """A sampled message on which the two matchers gave different verdicts."""
+
+    created_at: datetime
+    content: str
+    active: Optional[str]
+    candidate: Optional[str]
+
+
+@dataclass
+class ShadowReport:
+    """Sampled comparisons of a guild's matcher with a candidate engine.
+
+    The candidate never enforces anything: sampled messages are scanned by
+    it after the active matcher has acted on them, and differing verdicts
+    and the time each matcher took are kept in bounded ring buffers for
+    review.
+    """
+
+    engine: str
+    sample_rate: float = DEFAULT_SAMPLE_RATE
+    samples: int = 0
+    disagreement_count: int = 0
+    disagreements: deque[Disagreement] = field(
+        default_factory=lambda: deque(maxlen=MAX_DISAGREEMENTS)
+    )
+    timings: deque[tuple[float, float]] = field(
+        default_factory=lambda: deque(maxlen=MAX_TIMINGS)
+    )
+    started: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+    def should_sample(self) -> bool:
+        return random.random() < self.sample_rate
+
+    def compare(
+        self,
+        candidate: FilterMatcher,
+        content: str,
+        active_result: Optional[str],
+        active_seconds: float,
+        plain: Optional[str] = None,
+    ) -> None:
+        """Scan folded ``content`` with the candidate and record the outcome.
+
+        ``active_result`` and ``active_seconds`` are the verdict and scan
+        time of the active matcher on the same message. ``plain`` is the
+        lowercased message, passed to the candidate's ``find``.
+        """
+        started = time.perf_counter()
+        candidate_result = candidate.find(content, plain=plain)
+        candidate_seconds = time.perf_counter() - started
+
+        self.samples += 1
+        self.timings.append((active_seconds, candidate_seconds))
+        # Either side may report a different entry for the same message;
+        # only a different verdict counts as a disagreement.
+        if (active_result is None) != (candidate_result is None):
+            self.disagreement_count += 1
+            self.disagreements.append(
+                Disagreement(
+                    created_at=datetime.now(timezone.utc),
+                    content=content[:200],
+                    active=active_result,
+                    candidate=candidate_result,
+                )
+            )
+
+    def latency_summary(self) -> Optional[dict[str, float]]:
+        """Return median and p95 latencies in milliseconds, and their ratio."""
+        # Samples are recorded from worker threads; work on a snapshot.
+        timings = list(self.timings)
+        if not timings:
+            return None
+        active = sorted(timing[0] for timing in timings)
+        candidate = sorted(timing[1] for timing in timings)
+        ratios = [
+            candidate_seconds / active_seconds
+            for active_seconds, candidate_seconds in timings
+            if active_seconds > 0
+        ]
+        p95 = min(len(active) - 1, int(len(active) * 0.95))
+        return {
+            "active_p50": statistics.median(active) * 1000,
+            "active_p95": active[p95] * 1000,
+            "candidate_p50": statistics.median(candidate) * 1000,
+            "candidate_p95": candidate[p95] * 1000,
+            "ratio": statistics.median(ratios) if ratios else 1.0,
+        }
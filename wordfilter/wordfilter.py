@@ -1,7 +1,38 @@
-import re
+import asyncio
+import logging
+import shlex
+import time
+from datetime import datetime, timezone
 
 import discord
 from redbot.core import Config, commands
+from redbot.core.data_manager import cog_data_path
+from redbot.core.utils.menus import DEFAULT_CONTROLS, menu
+
+from .audit import HitStore
+from .cache import MISSING, ScanCache, content_hash
+from .deletion import DeletionExecutor
+from .executor import ScanExecutor
+from .fuzzy import MAX_DISTANCE, MIN_LENGTH
+from .filtersets import VALID_SET_NAME, FilterSetRegistry
+from .hitlog import FilterHit, HitLogQueue
+from .importer import FilterImportError, export_file, iter_attachment_entries
+from .matching import DEFAULT_ENGINE, ENGINES, WORD_TOKEN
+from .metrics import FilterMetrics
+from .normalize import strip_table
+from .patterns import (
+    MAX_WILDCARDS,
+    UnsafePatternError,
+    glob_parts,
+    is_wildcard,
+    validate_pattern,
+)
+from .scopes import Scope
+from .settings import GuildSettings
+from .shadow import DEFAULT_SAMPLE_RATE, ShadowReport
+
+
+log = logging.getLogger("red.xalvas.wordfilter")
 
 
 class WordFilter(commands.Cog):
@@ -11,8 +42,27 @@ class WordFilter(commands.Cog):
         "words": [],
         "log_channel": None,
         "exempt_roles": [],
+        "engine": DEFAULT_ENGINE,
+        "normalize": False,
+        "patterns": [],
+        "disabled_patterns": [],
+        "subscriptions": [],
+        "fuzzy": {},
+        "scopes": {},
+        "shadow_engine": None,
+        "shadow_rate": DEFAULT_SAMPLE_RATE,
     }
 
+    default_global = {
+        "filter_sets": {},
+    }
+
+    # Seconds to wait after an edit before recompiling the full matcher.
+    REBUILD_DELAY = 2
+
+    # Guilds compiled at once while warming up after a restart.
+    WARMUP_CONCURRENCY = 4
+
     def __init__(self, bot):
         self.bot = bot
 
@@ -23,6 +73,548 @@ class WordFilter(commands.Cog):
         )
 
         self.config.register_guild(**self.default_guild)
+        self.config.register_global(**self.default_global)
+
+        # Settings snapshots keyed by guild ID so on_message never has to
+        # await Config once a guild has been loaded.
+        self._settings = {}
+
+        # Guilds known to have no filters, rejected before any other work.
+        self._unfiltered_guilds = set()
+
+        # Recent scan results, so unchanged edits and copy-paste floods are
+        # not matched again. Bounded to 4 MiB and five minutes per entry.
+        self._scan_cache = ScanCache()
+
+        # Worker threads for long messages and very large matchers.
+        self._scan_executor = ScanExecutor()
+
+        # Owner-defined filter sets shared by every subscribed guild.
+        self._filter_sets = FilterSetRegistry()
+
+        # Background matcher rebuilds and scope compiles keyed by guild ID.
+        self._rebuild_tasks = {}
+        self._scope_tasks = {}
+
+        # Shadow-mode comparisons and candidate compiles keyed by guild ID,
+        # and candidate scans still running in the background.
+        self._shadow_reports = {}
+        self._shadow_tasks = {}
+        self._shadow_samples = set()
+
+        self._warmup_task = None
+
+        # Settings being read and compiled, keyed by guild ID, and guilds
+        # edited meanwhile or since warm-up read them, which Config has to
+        # be read again for.
+        self._loading = {}
+        self._reload_guilds = set()
+
+        # Per-guild scan, delete and log performance counters.
+        self._metrics = FilterMetrics()
+
+        self._hit_log = HitLogQueue(metrics=self._metrics)
+        self._deleter = DeletionExecutor(metrics=self._metrics)
+
+        # Searchable history of hits, written in batches off the loop.
+        self._hit_store = HitStore(cog_data_path(self) / "hits.sqlite3")
+
+    async def cog_load(self):
+        # Building the normalization tables walks every code point, so do
+        # it once off the event loop instead of on a guild's first message.
+        await asyncio.to_thread(strip_table)
+
+        self._filter_sets.load(await self.config.filter_sets())
+
+        await self._hit_store.open()
+
+        self._warmup_task = asyncio.create_task(self._warm_up())
+
+    async def cog_unload(self):
+        tasks = [
+            *self._rebuild_tasks.values(),
+            *self._scope_tasks.values(),
+            *self._shadow_tasks.values(),
+            *self._shadow_samples,
+            *self._loading.values(),
+        ]
+
+        if self._warmup_task is not None:
+            tasks.append(self._warmup_task)
+
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._rebuild_tasks.clear()
+        self._scope_tasks.clear()
+        self._shadow_tasks.clear()
+        self._shadow_samples.clear()
+
+        self._scan_executor.shutdown()
+        await self._deleter.close()
+        await self._hit_log.close()
+        await self._hit_store.close()
+
+    async def red_delete_data_for_user(self, *, requester, user_id):
+        await self._hit_store.delete_user(user_id)
+
+    async def _warm_up(self):
+        """Load every guild's settings and compile their matchers off the loop.
+
+        Guilds that send a message before they are warmed load the same
+        way from ``_get_settings``, sharing the load if it already started.
+        Settings are compiled from one ``all_guilds`` read; guilds edited
+        since are read again.
+        """
+
+        guilds = await self.config.all_guilds()
+        semaphore = asyncio.Semaphore(self.WARMUP_CONCURRENCY)
+
+        async def warm(guild_id):
+            # Let gateway events in between guilds.
+            await asyncio.sleep(0)
+
+            async with semaphore:
+                # Drop each snapshot once used, as the lists can be large.
+                data = guilds.pop(guild_id)
+
+                if guild_id in self._settings:
+                    return
+
+                try:
+                    await self._load_settings(guild_id, data)
+                except Exception:
+                    log.exception("Failed to precompile filters for guild %s", guild_id)
+
+        await asyncio.gather(*(warm(guild_id) for guild_id in list(guilds)))
+
+    async def _get_settings(self, guild):
+        settings = self._settings.get(guild.id)
+
+        if settings is None:
+            settings = await self._load_settings(guild.id)
+
+        return settings
+
+    async def _load_settings(self, guild_id, data=None):
+        """Load a guild's snapshot once, however many callers are waiting.
+
+        ``data`` is the guild's Config data when the caller already has it.
+        """
+
+        task = self._loading.get(guild_id)
+
+        if task is None:
+            task = asyncio.create_task(self._read_settings(guild_id, data))
+            self._loading[guild_id] = task
+
+        # A cancelled caller must not cancel the load for everyone else.
+        return await asyncio.shield(task)
+
+    async def _read_settings(self, guild_id, data=None):
+        """Read a guild's settings and compile them before publishing.
+
+        The snapshot is published together with its compiled matcher, so
+        no message compiles on the loop. Edits saved while compiling cannot
+        be applied to an unpublished snapshot; they restart the load from
+        Config instead, as do edits made since ``data`` was read.
+        """
+
+        try:
+            while True:
+                if data is None or guild_id in self._reload_guilds:
+                    self._reload_guilds.discard(guild_id)
+                    data = await self.config.guild_from_id(guild_id).all()
+
+                settings = GuildSettings.from_config(data)
+
+                if settings.has_filters:
+                    base = await asyncio.to_thread(
+                        settings.compile_base, data["words"], data["patterns"]
+                    )
+                    scope_matchers = await self._compile_scopes(guild_id, settings)
+                    await asyncio.to_thread(
+                        self._filter_sets.matchers,
+                        list(settings.subscriptions),
+                        settings.normalize,
+                    )
+                else:
+                    base = settings.compile_base((), ())
+                    scope_matchers = {}
+
+                if guild_id not in self._reload_guilds:
+                    break
+
+            settings.replace_base(base)
+            settings.install_scopes(scope_matchers)
+            self._settings[guild_id] = settings
+            self._sync_unfiltered(guild_id, settings)
+
+            return settings
+        finally:
+            self._reload_guilds.discard(guild_id)
+
+            if self._loading.get(guild_id) is asyncio.current_task():
+                del self._loading[guild_id]
+
+    def _loaded_settings(self, guild_id):
+        """Return the snapshot an edit applies to, or ``None`` if not loaded.
+
+        Editing a guild whose snapshot is still loading, or still waiting
+        to be warmed up, makes the load read Config again.
+        """
+
+        settings = self._settings.get(guild_id)
+        warming = self._warmup_task is not None and not self._warmup_task.done()
+
+        if settings is None and (warming or guild_id in self._loading):
+            self._reload_guilds.add(guild_id)
+
+        return settings
+
+    def _sync_unfiltered(self, guild_id, settings):
+        if settings.has_filters:
+            self._unfiltered_guilds.discard(guild_id)
+        else:
+            self._unfiltered_guilds.add(guild_id)
+
+    def _update_settings(self, guild, **changes):
+        """Apply a saved Config change to the guild's cached snapshot."""
+
+        settings = self._loaded_settings(guild.id)
+
+        if settings is None:
+            # Not loaded yet; the first message will read the new values.
+            return
+
+        staged = {
+            key: changes.pop(key) for key in ("engine", "normalize") if key in changes
+        }
+
+        for key, value in changes.items():
+            setattr(settings, key, value)
+
+        if staged or "patterns" in changes:
+            # Keep the current matcher live until its replacement has been
+            # compiled off the loop.
+            settings.stage(**staged)
+            self._scan_cache.discard_guild(guild.id)
+
+            if settings.needs_rebuild:
+                self._schedule_rebuild(guild.id)
+        elif "fuzzy" in changes:
+            settings.invalidate_fuzzy()
+            self._scan_cache.discard_guild(guild.id)
+        elif "subscriptions" in changes:
+            settings.version += 1
+            self._scan_cache.discard_guild(guild.id)
+
+        if "shadow_engine" in changes:
+            settings.shadow_matcher = None
+
+        if "scopes" in changes:
+            settings.invalidate_scopes()
+            self._scan_cache.discard_guild(guild.id)
+            self._schedule_scope_compile(guild.id)
+        elif "exempt_roles" in changes:
+            settings.invalidate_exemptions()
+
+        self._sync_unfiltered(guild.id, settings)
+
+    def _apply_word_changes(self, guild, added=(), removed=()):
+        """Layer filter edits over the compiled matcher and rebuild later."""
+
+        settings = self._loaded_settings(guild.id)
+
+        if settings is None:
+            return
+
+        settings.apply_word_changes(added, removed)
+        self._scan_cache.discard_guild(guild.id)
+        self._sync_unfiltered(guild.id, settings)
+
+        if settings.needs_rebuild:
+            self._schedule_rebuild(guild.id)
+
+    def _clear_words(self, guild):
+        """Empty the guild's cached filter list after ``filter clear``."""
+
+        settings = self._loaded_settings(guild.id)
+
+        if settings is None:
+            return
+
+        settings.clear_words()
+        self._scan_cache.discard_guild(guild.id)
+        self._sync_unfiltered(guild.id, settings)
+
+    def _schedule_rebuild(self, guild_id):
+        task = self._rebuild_tasks.get(guild_id)
+
+        if task is None or task.done():
+            self._rebuild_tasks[guild_id] = asyncio.create_task(
+                self._rebuild_matcher(guild_id)
+            )
+
+    async def _rebuild_matcher(self, guild_id):
+        """Recompile a guild's matcher off the loop and fold in the overlay."""
+
+        try:
+            while True:
+                # Let a burst of edits settle before compiling.
+                await asyncio.sleep(self.REBUILD_DELAY)
+
+                settings = self._settings.get(guild_id)
+
+                if settings is None or not settings.needs_rebuild:
+                    return
+
+                version = settings.version
+                words = await self.config.guild_from_id(guild_id).words()
+                base = await asyncio.to_thread(
+                    settings.compile_base, words, frozenset(settings.patterns)
+                )
+                scope_matchers = await self._compile_scopes(guild_id, settings)
+
+                # A normalization change also needs the subscribed sets
+                # folded the new way before it takes effect.
+                await asyncio.to_thread(
+                    self._filter_sets.matchers,
+                    list(settings.subscriptions),
+                    settings.next_normalize,
+                )
+
+                # Edits made while compiling are missing from the new base;
+                # keep the overlay and try again.
+                current = self._settings.get(guild_id)
+
+                if current is settings and settings.version == version:
+                    settings.replace_base(base)
+                    settings.install_scopes(scope_matchers)
+                    return
+        finally:
+            if self._rebuild_tasks.get(guild_id) is asyncio.current_task():
+                del self._rebuild_tasks[guild_id]
+
+    async def _compile_scopes(self, guild_id, settings):
+        """Compile the guild's scoped words off the loop, per channel layout.
+
+        Every scoped channel is compiled together with its category's
+        scope. Channels created or moved since are compiled on first use.
+        """
+
+        if not settings.scopes:
+            return {}
+
+        guild = self.bot.get_guild(guild_id)
+        keys = set()
+
+        for location_id in settings.scopes:
+            channel = guild.get_channel(location_id) if guild is not None else None
+            category_id = getattr(channel, "category_id", None)
+            keys.add(
+                frozenset(
+                    scope_id
+                    for scope_id in (category_id, location_id)
+                    if scope_id in settings.scopes
+                )
+            )
+
+        return await asyncio.to_thread(settings.compile_scopes, keys)
+
+    def _schedule_scope_compile(self, guild_id):
+        task = self._scope_tasks.get(guild_id)
+
+        if task is None or task.done():
+            self._scope_tasks[guild_id] = asyncio.create_task(
+                self._recompile_scopes(guild_id)
+            )
+
+    async def _recompile_scopes(self, guild_id):
+        """Compile a guild's edited scopes off the loop and install them."""
+
+        try:
+            while True:
+                settings = self._settings.get(guild_id)
+
+                # A pending rebuild compiles the scopes with the new base.
+                if settings is None or settings.needs_rebuild:
+                    return
+
+                version = settings.version
+                matchers = await self._compile_scopes(guild_id, settings)
+                current = self._settings.get(guild_id)
+
+                if current is settings and settings.version == version:
+                    settings.install_scopes(matchers)
+                    return
+        finally:
+            if self._scope_tasks.get(guild_id) is asyncio.current_task():
+                del self._scope_tasks[guild_id]
+
+    def _shadow_report(self, guild_id, settings):
+        """Return the guild's shadow report, or ``None`` when shadow mode is off."""
+
+        if settings.shadow_engine is None:
+            return None
+
+        report = self._shadow_reports.get(guild_id)
+
+        if report is None or report.engine != settings.shadow_engine:
+            report = ShadowReport(settings.shadow_engine)
+            self._shadow_reports[guild_id] = report
+
+        report.sample_rate = settings.shadow_rate
+
+        return report
+
+    def _schedule_shadow_compile(self, guild_id):
+        task = self._shadow_tasks.get(guild_id)
+
+        if task is None or task.done():
+            self._shadow_tasks[guild_id] = asyncio.create_task(
+                self._compile_shadow(guild_id)
+            )
+
+    async def _compile_shadow(self, guild_id):
+        """Compile a guild's shadow candidate off the loop."""
+
+        try:
+            settings = self._settings.get(guild_id)
+
+            if settings is None or settings.shadow_engine is None:
+                return
+
+            version = settings.version
+            engine = settings.shadow_engine
+            words = await self.config.guild_from_id(guild_id).words()
+            matcher = await asyncio.to_thread(
+                settings.compile_shadow, words, frozenset(settings.patterns)
+            )
+
+            # Edits made while compiling would make the candidate disagree
+            # for the wrong reason; the next sample schedules a retry.
+            current = self._settings.get(guild_id)
+
+            if (
+                current is settings
+                and settings.version == version
+                and settings.shadow_engine == engine
+            ):
+                settings.shadow_matcher = matcher
+        finally:
+            if self._shadow_tasks.get(guild_id) is asyncio.current_task():
+                del self._shadow_tasks[guild_id]
+
+    def _start_shadow_sample(self, sample):
+        """Run a sampled candidate scan from :meth:`_find_match` in the background."""
+
+        if sample is None:
+            return
+
+        task = asyncio.create_task(sample())
+        self._shadow_samples.add(task)
+        task.add_done_callback(self._shadow_samples.discard)
+
+    @staticmethod
+    def _normalize_entry(entry):
+        return entry.lower().strip()
+
+    @staticmethod
+    def _format_changes(verb, entries, location=None):
+        header = f"✅ {verb} {len(entries)} filter(s)"
+
+        if location is not None:
+            header += f" in {location.mention}"
+        body = "\n".join(f"• `{entry}`" for entry in entries)
+
+        if len(header) + len(body) > 1900:
+            return f"{header}."
+
+        return f"{header}:\n{body}"
+
+    async def _read_import(self, ctx):
+        """Stream normalized entries from the attached file.
+
+        Returns the deduplicated entries and the number of lines read, or
+        ``None`` after telling the user why nothing could be imported.
+        """
+
+        if not ctx.message.attachments:
+            await ctx.send("Please attach a text or CSV file to import.")
+            return None
+
+        entries = {}
+        lines = 0
+
+        try:
+            async for entry in iter_attachment_entries(ctx.message.attachments[0]):
+                lines += 1
+                entry = self._normalize_entry(entry)
+
+                if entry:
+                    entries[entry] = None
+
+        except FilterImportError as error:
+            await ctx.send(str(error))
+            return None
+
+        return entries, lines
+
+    async def _save_words(self, guild, words):
+        """Persist ``words`` in sorted order."""
+
+        await self.config.guild(guild).words.set(sorted(words))
+
+    async def _add_words(self, guild, entries):
+        """Add normalized ``entries`` and return the ones that were new."""
+
+        value = self.config.guild(guild).words
+
+        async with value.get_lock():
+            words = set(await value())
+            added = []
+
+            for entry in entries:
+                entry = self._normalize_entry(entry)
+
+                if entry and entry not in words:
+                    words.add(entry)
+                    added.append(entry)
+
+            if added:
+                await self._save_words(guild, words)
+                self._apply_word_changes(guild, added=added)
+
+        return added
+
+    async def _remove_words(self, guild, entries):
+        """Remove normalized ``entries`` and return the ones that existed."""
+
+        value = self.config.guild(guild).words
+
+        async with value.get_lock():
+            words = set(await value())
+            removed = []
+
+            for entry in entries:
+                entry = self._normalize_entry(entry)
+
+                if entry in words:
+                    words.remove(entry)
+                    removed.append(entry)
+
+            if removed:
+                await self._save_words(guild, words)
+
+                async with self.config.guild(guild).fuzzy() as fuzzy:
+                    for entry in removed:
+                        fuzzy.pop(entry, None)
+
+                self._apply_word_changes(guild, removed=removed)
+
+        return removed
 
     @commands.group()
     @commands.guild_only()
@@ -36,35 +628,39 @@ class WordFilter(commands.Cog):
         """
         Add one or more filtered words or phrases.
 
+        Use `*` as a wildcard for any run of letters within a word. Each
+        word still needs at least one letter of its own, and an entry may
+        use at most 4 wildcards; otherwise `*` is matched literally.
+
         Example:
-        [p]filter add word1 word2 "bad phrase"
+        [p]filter add word1 word2 "bad phrase" "fr*ee n*tro"
         """
 
         if not entries:
             await ctx.send("Please provide at least one word or phrase.")
             return
 
-        added = []
-
-        async with self.config.guild(ctx.guild).words() as words:
-            for entry in entries:
-                entry = entry.lower().strip()
-
-                if not entry:
-                    continue
-
-                if entry not in words:
-                    words.append(entry)
-                    added.append(entry)
+        added = await self._add_words(ctx.guild, entries)
 
         if not added:
             await ctx.send("Nothing new was added.")
             return
 
-        await ctx.send(
-            f"✅ Added {len(added)} filter(s):\n"
-            + "\n".join(f"• `{entry}`" for entry in added)
-        )
+        message = self._format_changes("Added", added)
+        literal = [
+            entry
+            for entry in added
+            if is_wildcard(entry) and glob_parts(entry) is None
+        ]
+
+        if literal:
+            message += (
+                f"\n`*` is matched literally in {len(literal)} entr(y/ies). "
+                f"Wildcards need a letter in every word and at most "
+                f"{MAX_WILDCARDS} `*` per entry."
+            )
+
+        await ctx.send(message[:2000])
 
     @filter.command(name="remove")
     async def filter_remove(self, ctx, *entries: str):
@@ -79,24 +675,13 @@ class WordFilter(commands.Cog):
             await ctx.send("Please provide at least one word or phrase.")
             return
 
-        removed = []
-
-        async with self.config.guild(ctx.guild).words() as words:
-            for entry in entries:
-                entry = entry.lower().strip()
-
-                if entry in words:
-                    words.remove(entry)
-                    removed.append(entry)
+        removed = await self._remove_words(ctx.guild, entries)
 
         if not removed:
             await ctx.send("None of those filters exist.")
             return
 
-        await ctx.send(
-            f"✅ Removed {len(removed)} filter(s):\n"
-            + "\n".join(f"• `{entry}`" for entry in removed)
-        )
+        await ctx.send(self._format_changes("Removed", removed))
 
     @filter.command(name="list")
     async def filter_list(self, ctx):
@@ -108,11 +693,16 @@ class WordFilter(commands.Cog):
             await ctx.send("No filters configured.")
             return
 
-        output = "\n".join(sorted(words))
+        fuzzy = await self.config.guild(ctx.guild).fuzzy()
+        output = "\n".join(
+            f"{word} (~{fuzzy[word]})" if word in fuzzy else word
+            for word in sorted(words)
+        )
 
         if len(output) > 1900:
             await ctx.send(
-                f"There are {len(words)} filters configured. The list is too long to display."
+                f"There are {len(words)} filters configured. The full list is attached.",
+                file=export_file(words, f"filters-{ctx.guild.id}.txt"),
             )
             return
 
@@ -120,146 +710,1380 @@ class WordFilter(commands.Cog):
             f"**Configured Filters ({len(words)})**\n```{output}```"
         )
 
-    @filter.command(name="clear")
-    async def filter_clear(self, ctx):
-        """Remove all filters."""
+    @filter.command(name="fuzzy")
+    async def filter_fuzzy(self, ctx, distance: int, *entries: str):
+        """
+        Also match misspellings of single-word filters.
 
-        await self.config.guild(ctx.guild).words.set([])
+        Words are matched when they are within `distance` edits (1 or 2)
+        of the filter, so `badword ~1` catches `b4dword` and `baadword`.
+        Use a distance of 0 to go back to exact matching.
 
-        await ctx.send("✅ All filters have been cleared.")
+        Example:
+        [p]filter fuzzy 1 badword otherword
+        """
 
-    @filter.command(name="logchannel")
-    async def filter_logchannel(
-        self,
-        ctx,
-        channel: discord.TextChannel,
-    ):
-        """Set the filter log channel."""
+        if not entries:
+            await ctx.send("Please provide at least one filtered word.")
+            return
 
-        await self.config.guild(ctx.guild).log_channel.set(channel.id)
+        if not 0 <= distance <= MAX_DISTANCE:
+            await ctx.send(f"The distance must be between 0 and {MAX_DISTANCE}.")
+            return
 
-        await ctx.send(
-            f"✅ Filter logs will be sent to {channel.mention}"
-        )
+        words = set(await self.config.guild(ctx.guild).words())
+        changed = []
+        skipped = []
 
-    @filter.command(name="exemptrole")
-    async def filter_exemptrole(
-        self,
-        ctx,
-        role: discord.Role,
-    ):
-        """Toggle role exemption."""
+        async with self.config.guild(ctx.guild).fuzzy() as fuzzy:
+            for entry in entries:
+                entry = self._normalize_entry(entry)
+
+                if entry not in words or not WORD_TOKEN.fullmatch(entry):
+                    skipped.append(entry)
+                elif distance == 0:
+                    if fuzzy.pop(entry, None) is not None:
+                        changed.append(entry)
+                elif len(entry) < MIN_LENGTH[distance]:
+                    skipped.append(entry)
+                else:
+                    fuzzy[entry] = distance
+                    changed.append(entry)
+
+        if changed:
+            self._update_settings(ctx.guild, fuzzy=dict(fuzzy))
+            message = self._format_changes(
+                "Set fuzzy distance on" if distance else "Disabled fuzzy matching for",
+                changed,
+            )
+        else:
+            message = "Nothing was changed."
+
+        if skipped:
+            message += (
+                f"\nSkipped {len(skipped)} entr(y/ies). Fuzzy matching needs a "
+                f"filtered single word of at least {MIN_LENGTH[1]} letters "
+                f"({MIN_LENGTH[2]} for a distance of 2)."
+            )
 
-        async with self.config.guild(ctx.guild).exempt_roles() as roles:
-            if role.id in roles:
-                roles.remove(role.id)
-                await ctx.send(
-                    f"✅ Removed exemption from **{role.name}**"
-                )
-            else:
-                roles.append(role.id)
-                await ctx.send(
-                    f"✅ Added exemption for **{role.name}**"
-                )
+        await ctx.send(message[:2000])
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
+    @filter.command(name="addregex")
+    async def filter_addregex(self, ctx, *, pattern: str):
+        """
+        Add a regular expression filter.
 
-        if not message.guild:
-            return
+        Patterns are matched case-insensitively against the whole message.
+        Backreferences, nested quantifiers, alternations inside repeated
+        groups and repeats that can match the same text one after another,
+        such as `\\w*\\w*`, are rejected. A pattern that runs too long is
+        disabled until it is added again.
+        """
 
-        if message.author.bot:
+        try:
+            validate_pattern(pattern)
+        except UnsafePatternError as error:
+            await ctx.send(str(error))
             return
 
-        exempt_roles = await self.config.guild(
-            message.guild
-        ).exempt_roles()
-
-        if any(role.id in exempt_roles for role in message.author.roles):
-            return
+        async with self.config.guild(ctx.guild).patterns() as patterns:
+            if pattern in patterns:
+                await ctx.send("That pattern already exists.")
+                return
 
-        filters = await self.config.guild(message.guild).words()
+            patterns.append(pattern)
 
-        if not filters:
-            return
+        await self._enable_pattern(ctx.guild, pattern)
 
-        content = message.content.lower()
+        self._update_settings(ctx.guild, patterns=set(patterns))
 
-        matched_filter = None
+        await ctx.send(f"✅ Added pattern `{pattern}`")
 
-        for entry in filters:
+    @filter.command(name="removeregex")
+    async def filter_removeregex(self, ctx, *, pattern: str):
+        """Remove a regular expression filter."""
 
-            entry = entry.lower()
+        async with self.config.guild(ctx.guild).patterns() as patterns:
+            if pattern not in patterns:
+                await ctx.send("That pattern does not exist.")
+                return
 
-            # Phrase filter
-            if " " in entry:
-                if entry in content:
-                    matched_filter = entry
-                    break
+            patterns.remove(pattern)
 
-            # Single word filter
-            else:
-                pattern = rf"\b{re.escape(entry)}\b"
+        await self._enable_pattern(ctx.guild, pattern)
 
-                if re.search(pattern, content):
-                    matched_filter = entry
-                    break
+        self._update_settings(ctx.guild, patterns=set(patterns))
 
-        if not matched_filter:
-            return
+        await ctx.send(f"✅ Removed pattern `{pattern}`")
 
-        try:
-            await message.delete()
-        except (discord.Forbidden, discord.NotFound):
-            pass
+    async def _enable_pattern(self, guild, pattern):
+        """Forget that ``pattern`` was disabled for being too slow."""
 
-        log_channel_id = await self.config.guild(
-            message.guild
-        ).log_channel()
+        settings = self._settings.get(guild.id)
 
-        if not log_channel_id:
-            return
+        if settings is not None:
+            settings.disabled_patterns.discard(pattern)
 
-        log_channel = message.guild.get_channel(log_channel_id)
+        async with self.config.guild(guild).disabled_patterns() as disabled:
+            if pattern in disabled:
+                disabled.remove(pattern)
 
-        if not log_channel:
-            return
+    async def _save_disabled_patterns(self, guild, settings):
+        """Persist patterns the scan budget disabled, so restarts keep them off."""
 
-        embed = discord.Embed(
-            title="🚨 Filter Triggered",
-            colour=discord.Colour.red(),
-            timestamp=discord.utils.utcnow(),
+        await self.config.guild(guild).disabled_patterns.set(
+            sorted(settings.disabled_patterns & settings.patterns)
         )
 
+    @filter.command(name="regexes")
+    async def filter_regexes(self, ctx):
+        """List regular expression filters."""
+
+        patterns = await self.config.guild(ctx.guild).patterns()
+
+        if not patterns:
+            await ctx.send("No patterns configured.")
+            return
+
+        settings = await self._get_settings(ctx.guild)
+
+        lines = [
+            f"{pattern} (disabled: too slow)"
+            if pattern in settings.disabled_patterns
+            else pattern
+            for pattern in sorted(patterns)
+        ]
+
+        await ctx.send(
+            f"**Configured Patterns ({len(patterns)})**\n```{chr(10).join(lines)[:1900]}```"
+        )
+
+    @filter.command(name="import")
+    async def filter_import(self, ctx):
+        """
+        Import filters from an attached text or CSV file.
+
+        Text files are read one entry per line. CSV files use the first
+        column of each row. Entries are normalized like `[p]filter add`
+        and merged into the existing list.
+        """
+
+        async with ctx.typing():
+            imported = await self._read_import(ctx)
+
+            if imported is None:
+                return
+
+            entries, lines = imported
+            added = await self._add_words(ctx.guild, entries)
+
+        await ctx.send(
+            f"✅ Imported {len(added)} new filter(s) from {lines} line(s). "
+            f"{len(entries) - len(added)} were already configured."
+        )
+
+    @filter.command(name="export")
+    async def filter_export(self, ctx):
+        """Export the configured filters as a text file."""
+
+        words = await self.config.guild(ctx.guild).words()
+
+        if not words:
+            await ctx.send("No filters configured.")
+            return
+
+        await ctx.send(
+            f"**Configured Filters ({len(words)})**",
+            file=export_file(words, f"filters-{ctx.guild.id}.txt"),
+        )
+
+    @filter.command(name="clear")
+    async def filter_clear(self, ctx):
+        """Remove all filters."""
+
+        async with self.config.guild(ctx.guild).words.get_lock():
+            await self._save_words(ctx.guild, set())
+            await self.config.guild(ctx.guild).fuzzy.clear()
+            self._clear_words(ctx.guild)
+
+        await ctx.send("✅ All filters have been cleared.")
+
+    @filter.command(name="engine")
+    async def filter_engine(self, ctx, engine: str = None):
+        """
+        Show or set the matching engine.
+
+        `regex` compiles the list into one pattern and suits most guilds.
+        `automaton` scans in time linear in the message length and is
+        meant for very large imported lists. `compact` is the same
+        automaton stored in flat arrays, using a fraction of the memory.
+        A new engine takes over once the list has been recompiled for it,
+        usually within a few seconds.
+        """
+
+        if engine is None:
+            current = await self.config.guild(ctx.guild).engine()
+            await ctx.send(
+                f"Current engine: `{current}`\n"
+                f"Available engines: {', '.join(f'`{name}`' for name in ENGINES)}"
+            )
+            return
+
+        engine = engine.lower()
+
+        if engine not in ENGINES:
+            await ctx.send(
+                f"Unknown engine. Choose one of: "
+                f"{', '.join(f'`{name}`' for name in ENGINES)}"
+            )
+            return
+
+        await self.config.guild(ctx.guild).engine.set(engine)
+        self._update_settings(ctx.guild, engine=engine)
+
+        await ctx.send(f"✅ Filter engine set to `{engine}`")
+
+    @filter.command(name="normalize")
+    async def filter_normalize(self, ctx, enabled: bool):
+        """
+        Toggle Unicode and leetspeak normalization.
+
+        When enabled, messages and filters are both folded before matching:
+        fullwidth letters and accents are flattened, invisible characters
+        are dropped and look-alike letters are mapped to plain ones. Digits
+        and symbols such as `4` or `$` are mapped too, but only inside
+        words. Filters still match the unfolded text, and regular
+        expressions only ever see it. The change takes effect once the
+        list has been recompiled, usually within a few seconds.
+        """
+
+        await self.config.guild(ctx.guild).normalize.set(enabled)
+        self._update_settings(ctx.guild, normalize=enabled)
+
+        await ctx.send(
+            f"✅ Normalization {'enabled' if enabled else 'disabled'}"
+        )
+
+    @filter.command(name="subscribe")
+    async def filter_subscribe(self, ctx, name: str):
+        """Subscribe this server to a shared filter set."""
+
+        name = name.lower()
+
+        if name not in self._filter_sets:
+            await ctx.send(
+                "That filter set does not exist. Available sets: "
+                + (", ".join(f"`{name}`" for name in self._filter_sets.names()) or "none")
+            )
+            return
+
+        # Compile the set off the loop before this server starts using it.
+        settings = await self._get_settings(ctx.guild)
+
+        async with ctx.typing():
+            await asyncio.to_thread(self._filter_sets.matcher, name, settings.normalize)
+
+        async with self.config.guild(ctx.guild).subscriptions() as subscriptions:
+            if name in subscriptions:
+                await ctx.send("This server is already subscribed to that set.")
+                return
+
+            subscriptions.append(name)
+
+        self._update_settings(ctx.guild, subscriptions=list(subscriptions))
+
+        await ctx.send(f"✅ Subscribed to filter set `{name}`")
+
+    @filter.command(name="unsubscribe")
+    async def filter_unsubscribe(self, ctx, name: str):
+        """Unsubscribe this server from a shared filter set."""
+
+        name = name.lower()
+
+        async with self.config.guild(ctx.guild).subscriptions() as subscriptions:
+            if name not in subscriptions:
+                await ctx.send("This server is not subscribed to that set.")
+                return
+
+            subscriptions.remove(name)
+
+        self._update_settings(ctx.guild, subscriptions=list(subscriptions))
+
+        await ctx.send(f"✅ Unsubscribed from filter set `{name}`")
+
+    @filter.command(name="subscriptions")
+    async def filter_subscriptions(self, ctx):
+        """List available filter sets and this server's subscriptions."""
+
+        subscriptions = await self.config.guild(ctx.guild).subscriptions()
+        names = self._filter_sets.names()
+
+        if not names:
+            await ctx.send("No filter sets have been defined.")
+            return
+
+        lines = [
+            f"{'✅' if name in subscriptions else '▫️'} `{name}` "
+            f"({len(self._filter_sets.entries(name))} entries)"
+            for name in names
+        ]
+
+        await ctx.send("**Filter Sets**\n" + "\n".join(lines))
+
+    @filter.command(name="logchannel")
+    async def filter_logchannel(
+        self,
+        ctx,
+        channel: discord.TextChannel,
+    ):
+        """Set the filter log channel."""
+
+        await self.config.guild(ctx.guild).log_channel.set(channel.id)
+        self._update_settings(ctx.guild, log_channel=channel.id)
+
+        await ctx.send(
+            f"✅ Filter logs will be sent to {channel.mention}"
+        )
+
+    @filter.command(name="exemptrole")
+    async def filter_exemptrole(
+        self,
+        ctx,
+        role: discord.Role,
+    ):
+        """Toggle role exemption."""
+
+        async with self.config.guild(ctx.guild).exempt_roles() as roles:
+            if role.id in roles:
+                roles.remove(role.id)
+                await ctx.send(
+                    f"✅ Removed exemption from **{role.name}**"
+                )
+            else:
+                roles.append(role.id)
+                await ctx.send(
+                    f"✅ Added exemption for **{role.name}**"
+                )
+
+        self._update_settings(ctx.guild, exempt_roles=frozenset(roles))
+
+    @filter.group(name="scope")
+    async def filter_scope(self, ctx):
+        """
+        Manage filters and exemptions for specific channels or categories.
+
+        Scoped rules add to the server-wide ones. A channel uses the rules
+        of its category as well as its own, and threads follow their
+        parent channel.
+        """
+        pass
+
+    async def _edit_scope(self, guild, location, edit):
+        """Apply ``edit`` to the scope for ``location`` and save it.
+
+        ``edit`` receives the :class:`Scope` and returns the command's
+        reply. Scopes left without any rules are removed.
+        """
+
+        async with self.config.guild(guild).scopes() as scopes:
+            scope = Scope.from_config(scopes.get(str(location.id), {}))
+            reply = edit(scope)
+
+            if scope.is_empty:
+                scopes.pop(str(location.id), None)
+            else:
+                scopes[str(location.id)] = scope.to_config()
+
+        self._update_settings(
+            guild,
+            scopes={
+                int(location_id): Scope.from_config(data)
+                for location_id, data in scopes.items()
+            },
+        )
+
+        return reply
+
+    @filter_scope.command(name="add")
+    async def filter_scope_add(
+        self, ctx, location: discord.abc.GuildChannel, *entries: str
+    ):
+        """
+        Add words or phrases filtered only in a channel or category.
+
+        Example:
+        [p]filter scope add #kids-chat word1 "bad phrase"
+        """
+
+        if not entries:
+            await ctx.send("Please provide at least one word or phrase.")
+            return
+
+        def edit(scope):
+            added = []
+
+            for entry in entries:
+                entry = self._normalize_entry(entry)
+
+                if entry and entry not in scope.words:
+                    scope.words.add(entry)
+                    added.append(entry)
+
+            return added
+
+        added = await self._edit_scope(ctx.guild, location, edit)
+
+        if not added:
+            await ctx.send("Nothing new was added.")
+            return
+
+        await ctx.send(self._format_changes("Added", added, location))
+
+    @filter_scope.command(name="remove")
+    async def filter_scope_remove(
+        self, ctx, location: discord.abc.GuildChannel, *entries: str
+    ):
+        """Remove words or phrases filtered only in a channel or category."""
+
+        if not entries:
+            await ctx.send("Please provide at least one word or phrase.")
+            return
+
+        def edit(scope):
+            removed = []
+
+            for entry in entries:
+                entry = self._normalize_entry(entry)
+
+                if entry in scope.words:
+                    scope.words.remove(entry)
+                    removed.append(entry)
+
+            return removed
+
+        removed = await self._edit_scope(ctx.guild, location, edit)
+
+        if not removed:
+            await ctx.send("None of those filters exist there.")
+            return
+
+        await ctx.send(self._format_changes("Removed", removed, location))
+
+    @filter_scope.command(name="exemptrole")
+    async def filter_scope_exemptrole(
+        self,
+        ctx,
+        location: discord.abc.GuildChannel,
+        role: discord.Role,
+    ):
+        """Toggle a role's exemption in a channel or category."""
+
+        def edit(scope):
+            if role.id in scope.exempt_roles:
+                scope.exempt_roles.remove(role.id)
+                return f"✅ Removed exemption from **{role.name}** in {location.mention}"
+
+            scope.exempt_roles.add(role.id)
+            return f"✅ Added exemption for **{role.name}** in {location.mention}"
+
+        await ctx.send(await self._edit_scope(ctx.guild, location, edit))
+
+    @filter_scope.command(name="exempt")
+    async def filter_scope_exempt(
+        self,
+        ctx,
+        location: discord.abc.GuildChannel,
+        exempt: bool,
+    ):
+        """Turn all filtering off, or back on, in a channel or category."""
+
+        def edit(scope):
+            scope.exempt = exempt
+
+            if exempt:
+                return f"✅ Messages in {location.mention} will not be filtered"
+
+            return f"✅ Messages in {location.mention} will be filtered"
+
+        await ctx.send(await self._edit_scope(ctx.guild, location, edit))
+
+    @filter_scope.command(name="list")
+    async def filter_scope_list(self, ctx):
+        """List channels and categories with their own rules."""
+
+        scopes = await self.config.guild(ctx.guild).scopes()
+
+        if not scopes:
+            await ctx.send("No scoped rules configured.")
+            return
+
+        lines = []
+
+        for location_id, data in scopes.items():
+            scope = Scope.from_config(data)
+            location = ctx.guild.get_channel(int(location_id))
+            name = location.mention if location else f"Deleted channel {location_id}"
+            rules = []
+
+            if scope.exempt:
+                rules.append("not filtered")
+
+            if scope.words:
+                rules.append(f"{len(scope.words)} filter(s)")
+
+            if scope.exempt_roles:
+                rules.append(f"{len(scope.exempt_roles)} exempt role(s)")
+
+            lines.append(f"{name}: {', '.join(rules)}")
+
+        await ctx.send(
+            f"**Scoped Rules ({len(lines)})**\n" + "\n".join(lines)[:1900]
+        )
+
+    @filter_scope.command(name="clear")
+    async def filter_scope_clear(self, ctx, location: discord.abc.GuildChannel):
+        """Remove every rule for a channel or category."""
+
+        def edit(scope):
+            scope.words.clear()
+            scope.exempt_roles.clear()
+            scope.exempt = False
+
+        await self._edit_scope(ctx.guild, location, edit)
+
+        await ctx.send(f"✅ Cleared the rules for {location.mention}")
+
+    @filter.command(name="stats")
+    async def filter_stats(self, ctx, reset: bool = False):
+        """
+        Show filter performance in this server since the cog was loaded.
+
+        Latencies are upper bounds of histogram buckets. Pass `true` to
+        reset the counters.
+        """
+
+        if reset:
+            self._metrics.reset(ctx.guild.id)
+            await ctx.send("✅ Filter statistics have been reset.")
+            return
+
+        metrics = self._metrics.get(ctx.guild.id)
+
+        if metrics is None:
+            await ctx.send("No messages have been scanned yet.")
+            return
+
+        def latency(histogram):
+            if not histogram.count:
+                return "No calls yet"
+
+            return (
+                f"p50 {histogram.percentile(0.5):g} ms · "
+                f"p95 {histogram.percentile(0.95):g} ms · "
+                f"p99 {histogram.percentile(0.99):g} ms\n"
+                f"mean {histogram.mean_ms:.2f} ms · max {histogram.max_ms:.2f} ms"
+            )
+
+        elapsed = time.monotonic() - metrics.started
+        embed = discord.Embed(
+            title="📊 Filter Statistics",
+            colour=discord.Colour.blurple(),
+        )
         embed.add_field(
-            name="Member",
-            value=f"{message.author.mention}\n`{message.author.id}`",
+            name="Messages",
+            value=(
+                f"{metrics.scanned} scanned ({metrics.scanned / max(elapsed, 1):.2f}/s)\n"
+                f"{metrics.hits} matched · {metrics.exempt} exempt"
+            ),
             inline=False,
         )
-
         embed.add_field(
-            name="Channel",
-            value=message.channel.mention,
+            name="Scan Latency",
+            value=latency(metrics.scan_latency),
             inline=False,
         )
-
         embed.add_field(
-            name="Matched Filter",
-            value=f"`{matched_filter}`",
+            name="Scan Cache",
+            value=(
+                f"{metrics.cache_hit_ratio:.1%} hit ratio "
+                f"({metrics.cache_hits} hits, {metrics.cache_misses} misses)"
+            ),
+            inline=False,
+        )
+        embed.add_field(
+            name=f"Deletes ({metrics.deletes.latency.count} calls, "
+            f"{metrics.deletes.failures} failed)",
+            value=latency(metrics.deletes.latency),
             inline=False,
         )
-
         embed.add_field(
-            name="Message Content",
-            value=message.content[:1024] or "*No content*",
+            name=f"Log Messages ({metrics.logs.latency.count} sends, "
+            f"{metrics.logs.failures} failed)",
+            value=latency(metrics.logs.latency),
             inline=False,
         )
+        embed.set_footer(text=f"Collected over {elapsed / 60:.0f} minute(s)")
+
+        await ctx.send(embed=embed)
+
+    @filter.group(name="shadow")
+    async def filter_shadow(self, ctx):
+        """
+        Compare another matching engine with the active one on live traffic.
+
+        A sample of messages is also scanned by the candidate engine. Its
+        verdicts are only recorded, never enforced.
+        """
+        pass
+
+    @filter_shadow.command(name="start")
+    async def filter_shadow_start(
+        self, ctx, engine: str, sample_rate: float = DEFAULT_SAMPLE_RATE
+    ):
+        """
+        Start shadowing the active engine with `engine`.
+
+        `sample_rate` is the fraction of scanned messages compared, from
+        0.001 to 1. Starting again discards the previous report.
+
+        Example:
+        [p]filter shadow start compact 0.1
+        """
+
+        engine = engine.lower()
+
+        if engine not in ENGINES:
+            await ctx.send(
+                f"Unknown engine. Choose one of: "
+                f"{', '.join(f'`{name}`' for name in ENGINES)}"
+            )
+            return
+
+        if engine == await self.config.guild(ctx.guild).engine():
+            await ctx.send("That engine is already active.")
+            return
+
+        if not 0.001 <= sample_rate <= 1:
+            await ctx.send("The sample rate must be between 0.001 and 1.")
+            return
+
+        await self.config.guild(ctx.guild).shadow_engine.set(engine)
+        await self.config.guild(ctx.guild).shadow_rate.set(sample_rate)
+        self._shadow_reports.pop(ctx.guild.id, None)
+        self._update_settings(
+            ctx.guild, shadow_engine=engine, shadow_rate=sample_rate
+        )
 
-        embed.set_footer(
-            text=message.guild.name
+        await ctx.send(
+            f"✅ Shadowing with `{engine}` on {sample_rate:.1%} of scanned messages"
         )
 
-        try:
-            await log_channel.send(embed=embed)
-        except discord.Forbidden:
-            pass
+    @filter_shadow.command(name="stop")
+    async def filter_shadow_stop(self, ctx):
+        """Stop shadow mode and discard its report."""
+
+        await self.config.guild(ctx.guild).shadow_engine.clear()
+        self._shadow_reports.pop(ctx.guild.id, None)
+        self._update_settings(ctx.guild, shadow_engine=None)
+
+        await ctx.send("✅ Shadow mode stopped.")
+
+    @filter_shadow.command(name="report")
+    async def filter_shadow_report(self, ctx):
+        """Show how the candidate engine compares with the active one."""
+
+        settings = await self._get_settings(ctx.guild)
+        report = self._shadow_report(ctx.guild.id, settings)
+
+        if report is None:
+            await ctx.send("Shadow mode is not running.")
+            return
+
+        embed = discord.Embed(
+            title=f"🔍 Shadow Report: `{settings.engine}` vs `{report.engine}`",
+            colour=discord.Colour.blurple(),
+            timestamp=report.started,
+        )
+        embed.add_field(
+            name="Samples",
+            value=(
+                f"{report.samples} compared at a {report.sample_rate:.1%} rate\n"
+                f"{report.disagreement_count} disagreement(s)"
+            ),
+            inline=False,
+        )
+
+        latency = report.latency_summary()
+
+        if latency is not None:
+            embed.add_field(
+                name="Latency",
+                value=(
+                    f"Active: p50 {latency['active_p50']:.3f} ms · "
+                    f"p95 {latency['active_p95']:.3f} ms\n"
+                    f"Candidate: p50 {latency['candidate_p50']:.3f} ms · "
+                    f"p95 {latency['candidate_p95']:.3f} ms\n"
+                    f"Candidate takes {latency['ratio']:.2f}× as long (median)"
+                ),
+                inline=False,
+            )
+
+        recent = list(report.disagreements)[-5:]
+
+        if recent:
+            embed.add_field(
+                name="Recent Disagreements",
+                value="\n".join(
+                    f"<t:{int(item.created_at.timestamp())}:R> "
+                    f"active `{item.active or 'clean'}`, "
+                    f"candidate `{item.candidate or 'clean'}`\n"
+                    f"> {discord.utils.escape_markdown(item.content[:100]).replace(chr(10), ' ')}"
+                    for item in reversed(recent)
+                )[:1024],
+                inline=False,
+            )
+
+        embed.set_footer(text="Comparisons started")
+
+        await ctx.send(embed=embed)
+
+    @staticmethod
+    def _parse_hit_time(value):
+        """Parse a duration ago such as ``7d`` or an ISO date, in UTC."""
+
+        try:
+            delta = commands.parse_timedelta(value)
+        except commands.BadArgument:
+            delta = None
+
+        if delta is not None:
+            return datetime.now(timezone.utc) - delta
+
+        try:
+            moment = datetime.fromisoformat(value)
+        except ValueError:
+            raise commands.BadArgument(
+                f"`{value}` is not a duration such as `2h` or a date such as `2024-05-01`."
+            ) from None
+
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+
+        return moment
+
+    @classmethod
+    def _parse_hit_query(cls, query):
+        """Turn ``key=value`` search terms into :meth:`HitStore.search` arguments."""
+
+        try:
+            terms = shlex.split(query)
+        except ValueError as error:
+            raise commands.BadArgument(f"Could not read the search: {error}.") from None
+
+        search = {}
+
+        for term in terms:
+            key, separator, value = term.partition("=")
+            key = key.lower()
+
+            if not separator or not value:
+                raise commands.BadArgument(f"`{term}` is not a `key=value` search term.")
+
+            if key == "user":
+                user_id = value.strip("<@!>")
+
+                if not user_id.isdigit():
+                    raise commands.BadArgument(f"`{value}` is not a user mention or ID.")
+
+                search["user_id"] = int(user_id)
+            elif key == "filter":
+                # Hits store the entry as it matched, which for patterns is
+                # the case-sensitive source, so search for it verbatim.
+                search["matched_filter"] = value.strip()
+            elif key in ("since", "until"):
+                search[key] = cls._parse_hit_time(value)
+            else:
+                raise commands.BadArgument(
+                    f"Unknown search term `{key}`. Use `user`, `filter`, `since` or `until`."
+                )
+
+        return search
+
+    @filter.command(name="hits")
+    async def filter_hits(self, ctx, *, query: str = ""):
+        """
+        Search the history of deleted messages, newest first.
+
+        Narrow the search with any of these terms:
+        `user=` a member mention or ID
+        `filter=` the filter that matched, as shown in its hits
+        `since=` and `until=` a duration ago such as `7d`, or a date such as `2024-05-01`
+
+        Up to 250 of the most recent matching hits are shown.
+
+        Example:
+        [p]filter hits user=@someone since=7d
+        [p]filter hits filter="bad phrase" until=2024-05-01
+        """
+
+        try:
+            search = self._parse_hit_query(query)
+        except commands.BadArgument as error:
+            await ctx.send(str(error))
+            return
+
+        records = await self._hit_store.search(ctx.guild.id, **search)
+
+        if not records:
+            await ctx.send("No matching filter hits were found.")
+            return
+
+        pages = []
+
+        for start in range(0, len(records), 10):
+            lines = [
+                f"<t:{int(record.created_at.timestamp())}:f> <@{record.user_id}> "
+                f"in <#{record.channel_id}> matched `{record.matched_filter}`\n"
+                f"> {discord.utils.escape_markdown(record.content[:100]).replace(chr(10), ' ') or '*No content*'}"
+                for record in records[start : start + 10]
+            ]
+            embed = discord.Embed(
+                title=f"Filter Hits ({len(records)})",
+                description="\n".join(lines)[:4096],
+                colour=discord.Colour.red(),
+            )
+            embed.set_footer(
+                text=f"Page {start // 10 + 1}/{(len(records) + 9) // 10}"
+            )
+            pages.append(embed)
+
+        if len(pages) == 1:
+            await ctx.send(embed=pages[0])
+            return
+
+        await menu(ctx, pages, DEFAULT_CONTROLS)
+
+    async def _find_match(self, guild, settings, view, content):
+        """
+        Return the filter matched by raw ``content``, using the scan cache.
+
+        Also returns whether the result came from the cache, and the shadow
+        sample to pass to :meth:`_start_shadow_sample` once the message has
+        been dealt with, if this message was sampled.
+        """
+
+        # Key on the folded text so case and invisible-character variants
+        # of the same spam share one entry. Filters also match the merely
+        # lowercased text and regexes only see that, so when folding
+        # changed anything it is part of the key as well.
+        folded = settings.fold(content)
+        plain = content.lower() if settings.normalize else None
+
+        if plain is None or plain == folded:
+            plain = None
+            digest = content_hash(folded)
+        else:
+            digest = content_hash(f"{folded}\0{plain}")
+
+        version = (settings.version, self._filter_sets.version)
+        matched_filter = self._scan_cache.get(guild.id, view.key, version, digest)
+        cached = matched_filter is not MISSING
+        sample = None
+
+        if not cached:
+            active = settings.matcher
+            matchers = [active]
+
+            if view.matcher is not None:
+                matchers.append(view.matcher)
+
+            matchers.extend(
+                self._filter_sets.matchers(settings.subscriptions, settings.normalize)
+            )
+
+            if settings.fuzzy_index is not None:
+                matchers.append(settings.fuzzy_index)
+
+            disabled = len(settings.disabled_patterns)
+
+            # The guild's own matcher is timed for shadow mode, whose
+            # candidate is compared against it alone.
+            active_scan = []
+
+            def scan(text):
+                started = time.perf_counter()
+                matched = active.find(text, plain=plain)
+                active_scan.append((matched, time.perf_counter() - started))
+
+                if matched:
+                    return matched
+
+                for matcher in matchers[1:]:
+                    matched = matcher.find(text, plain=plain)
+
+                    if matched:
+                        return matched
+
+                return None
+
+            matched_filter = await self._scan_executor.run(
+                scan,
+                folded,
+                sum(map(len, matchers)),
+                offload=not any(matcher.regex_bound for matcher in matchers),
+            )
+            self._scan_cache.put(guild.id, view.key, version, digest, matched_filter)
+
+            if len(settings.disabled_patterns) != disabled:
+                await self._save_disabled_patterns(guild, settings)
+
+            report = self._shadow_report(guild.id, settings)
+
+            if report is not None and report.should_sample():
+                candidate = settings.shadow_matcher
+
+                if candidate is None:
+                    self._schedule_shadow_compile(guild.id)
+                else:
+                    active_result, active_seconds = active_scan[0]
+
+                    def compare(text):
+                        report.compare(
+                            candidate, text, active_result, active_seconds, plain
+                        )
+
+                    async def scan_candidate():
+                        await self._scan_executor.run(
+                            compare,
+                            folded,
+                            len(candidate),
+                            offload=not candidate.regex_bound,
+                        )
+
+                    sample = scan_candidate
+
+        return matched_filter, cached, sample
+
+    async def _scan(self, guild, channel, message, author_id, role_ids, content):
+        """
+        Delete and log ``message`` if its content matches a filter.
+
+        ``role_ids`` returns the author's role IDs, or ``None`` when they
+        are unknown. It is only called when the author's exemption verdict
+        is not cached yet.
+        """
+
+        if guild.id in self._unfiltered_guilds:
+            return
+
+        settings = await self._get_settings(guild)
+
+        if not settings.has_filters:
+            return
+
+        # Threads follow the rules of the channel they were created in.
+        if isinstance(channel, discord.Thread):
+            location_id = channel.parent_id
+        else:
+            location_id = channel.id
+
+        view = settings.scope_view(location_id, channel.category_id)
+
+        if view.exempt:
+            return
+
+        if settings.is_exempt(author_id, view, role_ids):
+            self._metrics.guild(guild.id).exempt += 1
+            return
+
+        started = time.perf_counter()
+        matched_filter, cached, sample = await self._find_match(
+            guild, settings, view, content
+        )
+        self._metrics.record_scan(
+            guild.id, time.perf_counter() - started, bool(matched_filter), cached
+        )
+
+        if not matched_filter:
+            self._start_shadow_sample(sample)
+            return
+
+        await self._deleter.delete(message)
+        self._start_shadow_sample(sample)
+
+        hit = FilterHit(
+            member_mention=f"<@{author_id}>",
+            member_id=author_id,
+            channel_mention=channel.mention,
+            matched_filter=matched_filter,
+            content=content[:1024],
+        )
+
+        self._hit_store.record(
+            guild.id,
+            channel.id,
+            author_id,
+            matched_filter,
+            hit.content,
+            hit.created_at,
+        )
+
+        log_channel_id = settings.log_channel
+
+        if not log_channel_id:
+            return
+
+        log_channel = guild.get_channel(log_channel_id)
+
+        if not log_channel:
+            return
+
+        self._hit_log.enqueue(guild, log_channel, hit)
+
+    @commands.group(name="filterset")
+    @commands.is_owner()
+    async def filterset(self, ctx):
+        """Manage filter sets shared between servers."""
+        pass
+
+    async def _save_filter_set(self, name, words):
+        """Save a filter set and swap it in with its matchers compiled.
+
+        Matchers are compiled off the loop for every normalization setting
+        in use by subscribers, so their next message never compiles the
+        new list.
+        """
+
+        words = frozenset(words)
+        variants = self._filter_sets.compiled_variants(name)
+
+        for settings in self._settings.values():
+            if name in settings.subscriptions:
+                variants.update((settings.normalize, settings.next_normalize))
+
+        compiled = {}
+
+        for normalize in variants:
+            compiled[normalize] = await asyncio.to_thread(
+                self._filter_sets.build, words, normalize
+            )
+
+        await self.config.set_raw("filter_sets", name, value=sorted(words))
+        self._filter_sets.set(name, words, compiled)
+
+    async def _edit_filter_set(self, name, edit):
+        """Apply ``edit`` to the entries of filter set ``name`` and save them.
+
+        ``edit`` receives the entries as a set and returns the entries it
+        changed. Edits are serialized, since compiling a large set takes
+        a while and a concurrent edit would otherwise be lost.
+        """
+
+        async with self.config.filter_sets.get_lock():
+            words = set(self._filter_sets.entries(name))
+            changed = edit(words)
+
+            if changed:
+                await self._save_filter_set(name, words)
+
+        return changed
+
+    @filterset.command(name="create")
+    async def filterset_create(self, ctx, name: str):
+        """
+        Create an empty filter set.
+
+        Names may use lowercase letters, digits, `-` and `_`.
+        """
+
+        name = name.lower()
+
+        if not VALID_SET_NAME.fullmatch(name):
+            await ctx.send(
+                "Set names must be 1-32 lowercase letters, digits, `-` or `_`."
+            )
+            return
+
+        async with self.config.filter_sets.get_lock():
+            if name in self._filter_sets:
+                await ctx.send("That filter set already exists.")
+                return
+
+            await self._save_filter_set(name, set())
+
+        await ctx.send(f"✅ Created filter set `{name}`")
+
+    @filterset.command(name="delete")
+    async def filterset_delete(self, ctx, name: str):
+        """Delete a filter set. Subscribed servers stop using it."""
+
+        name = name.lower()
+
+        async with self.config.filter_sets.get_lock():
+            if name not in self._filter_sets:
+                await ctx.send("That filter set does not exist.")
+                return
+
+            await self.config.clear_raw("filter_sets", name)
+            self._filter_sets.delete(name)
+
+        await ctx.send(f"✅ Deleted filter set `{name}`")
+
+    @filterset.command(name="add")
+    async def filterset_add(self, ctx, name: str, *entries: str):
+        """Add words or phrases to a filter set."""
+
+        name = name.lower()
+
+        if name not in self._filter_sets:
+            await ctx.send("That filter set does not exist.")
+            return
+
+        def edit(words):
+            added = []
+
+            for entry in entries:
+                entry = self._normalize_entry(entry)
+
+                if entry and entry not in words:
+                    words.add(entry)
+                    added.append(entry)
+
+            return added
+
+        async with ctx.typing():
+            added = await self._edit_filter_set(name, edit)
+
+        if not added:
+            await ctx.send("Nothing new was added.")
+            return
+
+        await ctx.send(self._format_changes("Added", added))
+
+    @filterset.command(name="remove")
+    async def filterset_remove(self, ctx, name: str, *entries: str):
+        """Remove words or phrases from a filter set."""
+
+        name = name.lower()
+
+        if name not in self._filter_sets:
+            await ctx.send("That filter set does not exist.")
+            return
+
+        def edit(words):
+            removed = []
+
+            for entry in entries:
+                entry = self._normalize_entry(entry)
+
+                if entry in words:
+                    words.remove(entry)
+                    removed.append(entry)
+
+            return removed
+
+        async with ctx.typing():
+            removed = await self._edit_filter_set(name, edit)
+
+        if not removed:
+            await ctx.send("None of those filters exist.")
+            return
+
+        await ctx.send(self._format_changes("Removed", removed))
+
+    @filterset.command(name="import")
+    async def filterset_import(self, ctx, name: str):
+        """Import entries into a filter set from an attached text or CSV file."""
+
+        name = name.lower()
+
+        if name not in self._filter_sets:
+            await ctx.send("That filter set does not exist.")
+            return
+
+        async with ctx.typing():
+            imported = await self._read_import(ctx)
+
+            if imported is None:
+                return
+
+            entries, lines = imported
+
+            def edit(words):
+                added = [entry for entry in entries if entry not in words]
+                words.update(added)
+
+                return added
+
+            added = await self._edit_filter_set(name, edit)
+
+        await ctx.send(
+            f"✅ Imported {len(added)} new entries into `{name}` from {lines} line(s)."
+        )
+
+    @filterset.command(name="export")
+    async def filterset_export(self, ctx, name: str):
+        """Export a filter set as a text file."""
+
+        name = name.lower()
+        words = self._filter_sets.entries(name)
+
+        if not words:
+            await ctx.send("That filter set does not exist or is empty.")
+            return
+
+        await ctx.send(
+            f"**Filter Set `{name}` ({len(words)})**",
+            file=export_file(words, f"filterset-{name}.txt"),
+        )
+
+    @filterset.command(name="list")
+    async def filterset_list(self, ctx):
+        """List filter sets and how many servers subscribe to each."""
+
+        names = self._filter_sets.names()
+
+        if not names:
+            await ctx.send("No filter sets have been defined.")
+            return
+
+        all_guilds = await self.config.all_guilds()
+        lines = []
+
+        for name in names:
+            subscribers = sum(
+                name in data.get("subscriptions", ())
+                for data in all_guilds.values()
+            )
+            lines.append(
+                f"`{name}`: {len(self._filter_sets.entries(name))} entries, "
+                f"{subscribers} subscriber(s)"
+            )
+
+        await ctx.send("**Filter Sets**\n" + "\n".join(lines))
+
+    @staticmethod
+    def _role_ids(member):
+        """Return a member's role IDs, or ``None`` if they are unknown."""
+
+        roles = getattr(member, "roles", None)
+
+        if roles is None:
+            return None
+
+        return [role.id for role in roles]
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+
+        if not message.guild:
+            return
+
+        if message.author.bot:
+            return
+
+        await self._scan(
+            message.guild,
+            message.channel,
+            message,
+            message.author.id,
+            lambda: [role.id for role in message.author.roles],
+            message.content,
+        )
+
+    @commands.Cog.listener()
+    async def on_message_edit(
+        self,
+        before: discord.Message,
+        after: discord.Message,
+    ):
+
+        if not after.guild:
+            return
+
+        if after.author.bot:
+            return
+
+        # Embed unfurls and pin changes also fire edits; only new text
+        # needs scanning.
+        if before.content == after.content:
+            return
+
+        await self._scan(
+            after.guild,
+            after.channel,
+            after,
+            after.author.id,
+            lambda: self._role_ids(after.author),
+            after.content,
+        )
+
+    @commands.Cog.listener()
+    async def on_raw_message_edit(
+        self,
+        payload: discord.RawMessageUpdateEvent,
+    ):
+
+        # Cached messages are handled by on_message_edit.
+        if payload.cached_message is not None:
+            return
+
+        if payload.guild_id is None:
+            return
+
+        data = payload.data
+
+        # Edits without a content field only changed embeds or flags.
+        content = data.get("content")
+
+        if content is None:
+            return
+
+        author = data.get("author") or {}
+
+        if "id" not in author or author.get("bot") or data.get("webhook_id"):
+            return
+
+        guild = self.bot.get_guild(payload.guild_id)
+
+        if guild is None:
+            return
+
+        channel = guild.get_channel_or_thread(payload.channel_id)
+
+        if channel is None:
+            return
+
+        author_id = int(author["id"])
+        member = data.get("member")
+
+        def role_ids():
+            if member is not None:
+                return [int(role_id) for role_id in member.get("roles", ())]
+
+            # Without member data the roles are only known if cached.
+            return self._role_ids(guild.get_member(author_id))
+
+        await self._scan(
+            guild,
+            channel,
+            channel.get_partial_message(payload.message_id),
+            author_id,
+            role_ids,
+            content,
+        )
+
+    @commands.Cog.listener()
+    async def on_member_update(
+        self,
+        before: discord.Member,
+        after: discord.Member,
+    ):
+
+        if before.roles == after.roles:
+            return
+
+        settings = self._settings.get(after.guild.id)
+
+        if settings is not None:
+            settings.forget_member(after.id)